@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+
+# Measures the import time of the robot stack and checks that no heavy dependencies are loaded.
+# Each module is imported in a fresh interpreter, run from the root of the project:
+#
+#     python -m Benchmarks.ImportTime
+#
+# Exits with status 1 if a module loads a heavy dependency or exceeds the time budget.
+
+MODULES = (
+    "Communication.SocketConnection",
+    "Communication.ModbusTCP",
+    "Robot.UR.URIOState",
+    "Robot.UR.URKinematics",
+    "Robot.UR.URMailbox",
+    "Robot.UR.URModbusServer",
+    "Robot.UR.URMotionEstimator",
+    "Robot.UR.URRecorder",
+    "Robot.UR.URSafetyLimits",
+    "Robot.UR.URScript",
+    "Robot.UR.URRobot",
+    "Robot.RoutePlanner",
+    "Robot.SearchPlanner",
+    "Robot.PickScheduler",
+    "Utils.LazyModule",
+    "Vision.Camera",
+)
+
+HEAVY_MODULES = ("cv2", "numpy")
+
+BUDGET = 0.05   # Seconds allowed for importing a single module
+
+SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed)
+print(",".join(name for name in {heavy!r} if name in sys.modules))
+"""
+
+
+def measure(module):
+    """
+    Import a module in a fresh interpreter
+    :param module: Name of the module to import
+    :return: Import time in seconds and the heavy modules that were loaded
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.check_output(
+        [sys.executable, "-c", SCRIPT.format(module=module, heavy=HEAVY_MODULES)], cwd=root)
+    elapsed, heavy = output.decode().split("\n")[:2]
+    return float(elapsed), [name for name in heavy.split(",") if name]
+
+
+def main():
+    failed = False
+    for module in MODULES:
+        elapsed, heavy = measure(module)
+        status = "ok"
+        if heavy:
+            status = "FAIL: loads " + ", ".join(heavy)
+        elif elapsed > BUDGET:
+            status = "FAIL: over budget of {:.0f} ms".format(BUDGET * 1000)
+        failed |= status != "ok"
+        print("{:<35} {:7.2f} ms  {}".format(module, elapsed * 1000, status))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
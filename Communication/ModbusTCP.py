@@ -1,5 +1,7 @@
 import struct
 import random
+import time
+from threading import Event, Lock
 
 from Communication.SocketConnection import SocketConnection
 
@@ -89,23 +91,43 @@ from Communication.SocketConnection import SocketConnection
 # http://www.modbus.org/docs/Modbus_Messaging_Implementation_Guide_V1_0b.pdf
 
 
+class _PendingRead:
+    """
+    A read request on the wire, shared by all threads requesting the same data
+    """
+    __slots__ = ('done', 'response', 'writes')
+
+    def __init__(self, writes):
+        self.done = Event()
+        self.response = None
+        self.writes = writes    # Number of completed writes when the read was sent
+
+
 class ModbusTCP:
     """
     A Modbus communication class designed for use with modbusTCP
+
+    The class is thread safe. Requests are sent one at a time over the socket,
+    identical reads that are in flight at the same time share a single request
+    and read responses can be cached for a short period with set_cache_ttl().
     """
     __version__ = '0.1'
 
     # Modbus function code
     READ_COILS = 0x01
     READ_HOLDING_REGISTERS = 0x03
+    WRITE_SINGLE_COIL = 0x05
+    WRITE_SINGLE_REGISTER = 0x06
+    WRITE_MULTIPLE_COILS = 0x0F
+    WRITE_MULTIPLE_REGISTERS = 0x10
+
+    # Maximum quantities that fit in a single request (Modbus Application Protocol V1.1b)
+    MAX_WRITE_COILS = 0x07B0
+    MAX_WRITE_REGISTERS = 0x007B
 
     # Todo: Implement the following modbus functionality:
     # READ_DISCRETE_INPUTS = 0x02
     # READ_INPUT_REGISTERS = 0x04
-    # WRITE_SINGLE_COIL = 0x05
-    # WRITE_SINGLE_REGISTER = 0x06
-    # WRITE_MULTIPLE_COILS = 0x0F
-    # WRITE_MULTIPLE_REGISTERS = 0x10
 
     # Todo: Implement error checking with the following exception codes
     # Modbus exception code
@@ -118,14 +140,20 @@ class ModbusTCP:
         :param host: IP address to connect with
         :param port: Pot (standard 502) to connect with
         """
-        self.__transaction_id = 0           # For synchronization between messages of server and client
         self.__protocol_id = 0              # 0 for Modbus/TCP
         self.__unit_id = 0                  # Slave address (255 if not used)
 
         self.pretty_print_response = False  # Check to print out response message in console
+        self.cache_ttl = 0                  # Seconds a read response is reused, 0 disables the cache
 
         self.connection = SocketConnection(host, port)
 
+        self.__send_lock = Lock()           # One request at a time on the socket
+        self.__read_lock = Lock()           # Guards the pending reads and the cache
+        self.__pending_reads = {}           # (function code, data bytes) -> _PendingRead
+        self.__cache = {}                   # (function code, data bytes) -> (time received, response, writes)
+        self.__writes = 0                   # Number of completed writes, reads from before a write are not reused
+
     def open(self):
         """
         Open the socket for communication
@@ -146,8 +174,7 @@ class ModbusTCP:
         :return:
         """
         data_bytes = struct.pack(">HH", bit_address, quantity)
-        message = self._create_message(self.READ_COILS, data_bytes)
-        return self._send(message)
+        return self._read(self.READ_COILS, data_bytes)
 
     def read_holding_registers(self, reg_address, quantity=1):
         """Main function 3 of Modbus/TCP - 0x03.
@@ -158,8 +185,128 @@ class ModbusTCP:
         :return: The values stored in the addresses specified in Bytes
         """
         data_bytes = struct.pack(">HH", reg_address, quantity)
-        message = self._create_message(self.READ_HOLDING_REGISTERS, data_bytes)
-        return self._send(message)
+        return self._read(self.READ_HOLDING_REGISTERS, data_bytes)
+
+    def write_single_coil(self, bit_address, value):
+        """Main function 5 of Modbus/TCP - 0x05
+
+        Sets a single output to either ON or OFF.
+        :param bit_address: Address of the coil to write
+        :param value: Boolean, True for ON and False for OFF
+        :return: Bytes response (echo of the request), None on error
+        """
+        data_bytes = struct.pack(">HH", bit_address, 0xFF00 if value else 0x0000)
+        return self._write(self.WRITE_SINGLE_COIL, data_bytes)
+
+    def write_single_register(self, reg_address, value):
+        """Main function 6 of Modbus/TCP - 0x06
+
+        Writes a single holding register.
+        :param reg_address: Address of the register to write
+        :param value: 16-bit value to write, negative values are written as two's complement
+        :return: Bytes response (echo of the request), None on error
+        """
+        data_bytes = struct.pack(">HH", reg_address, self._register_value(value))
+        return self._write(self.WRITE_SINGLE_REGISTER, data_bytes)
+
+    def write_multiple_coils(self, bit_address, values):
+        """Main function 15 of Modbus/TCP - 0x0F
+
+        Sets a sequence of coils in a single request.
+        The coils are packed eight per byte, the first coil in the least significant bit.
+        :param bit_address: Address of the first coil to write
+        :param values: Iterable of booleans, one for each coil
+        :return: Bytes response (address and quantity written), None on error
+        """
+        values = [bool(value) for value in values]
+        quantity = len(values)
+        if not 0 < quantity <= self.MAX_WRITE_COILS:
+            raise ValueError("Modbus: Can write 1 to {} coils, got {}".format(self.MAX_WRITE_COILS, quantity))
+
+        packed = bytearray((quantity + 7) // 8)
+        for i, value in enumerate(values):
+            if value:
+                packed[i // 8] |= 1 << (i % 8)
+
+        data_bytes = struct.pack(">HHB", bit_address, quantity, len(packed)) + bytes(packed)
+        return self._write(self.WRITE_MULTIPLE_COILS, data_bytes)
+
+    def write_multiple_registers(self, reg_address, values):
+        """Main function 16 of Modbus/TCP - 0x10
+
+        Writes a block of contiguous registers in a single request.
+        :param reg_address: Address of the first register to write
+        :param values: Iterable of 16-bit values, negative values are written as two's complement
+        :return: Bytes response (address and quantity written), None on error
+        """
+        values = [self._register_value(value) for value in values]
+        quantity = len(values)
+        if not 0 < quantity <= self.MAX_WRITE_REGISTERS:
+            raise ValueError("Modbus: Can write 1 to {} registers, got {}".format(
+                self.MAX_WRITE_REGISTERS, quantity))
+
+        data_bytes = struct.pack(">HHB{}H".format(quantity), reg_address, quantity, quantity * 2, *values)
+        return self._write(self.WRITE_MULTIPLE_REGISTERS, data_bytes)
+
+    @staticmethod
+    def _register_value(value):
+        """
+        Raises a ValueError if the value does not fit in a 16-bit register
+        :param value: signed or unsigned 16-bit value
+        :return: unsigned 16-bit value, negative values as two's complement
+        """
+        if not -0x8000 <= value <= 0xFFFF:
+            raise ValueError("Modbus: Register values must be -32768 to 65535, got {}".format(value))
+        return value & 0xFFFF
+
+    def _read(self, function_code, data_bytes):
+        """ Send a read request, coalesced with identical reads
+
+        If the same read is already on the wire, wait for it and share its response.
+        Reads sent before the last completed write are neither shared nor cached.
+        :param function_code: Modbus read function code
+        :param data_bytes: bytes
+        :return: Bytes response, None on error
+        """
+        key = (function_code, data_bytes)
+        with self.__read_lock:
+            if self.cache_ttl > 0 and key in self.__cache:
+                received, response, writes = self.__cache[key]
+                if time.monotonic() - received < self.cache_ttl and writes == self.__writes:
+                    return response
+            pending = self.__pending_reads.get(key)
+            owner = pending is None or pending.writes != self.__writes
+            if owner:
+                pending = self.__pending_reads[key] = _PendingRead(self.__writes)
+
+        if not owner:
+            pending.done.wait()
+            return pending.response
+
+        try:
+            pending.response = self._send(self._create_message(function_code, data_bytes))
+        finally:
+            with self.__read_lock:
+                if self.__pending_reads.get(key) is pending:
+                    del self.__pending_reads[key]
+                if self.cache_ttl > 0 and pending.response is not None and pending.writes == self.__writes:
+                    self.__cache[key] = (time.monotonic(), pending.response, pending.writes)
+            pending.done.set()
+        return pending.response
+
+    def _write(self, function_code, data_bytes):
+        """ Send a write request
+
+        Cached read responses are dropped, as they may no longer be valid.
+        :param function_code: Modbus write function code
+        :param data_bytes: bytes
+        :return: Bytes response, None on error
+        """
+        response = self._send(self._create_message(function_code, data_bytes))
+        with self.__read_lock:
+            self.__writes += 1
+            self.__cache.clear()
+        return response
 
     def _create_message(self, function_code, data_bytes):
         """
@@ -169,9 +316,9 @@ class ModbusTCP:
         :return: Bytes modbus packet
         """
         body = struct.pack('>B', function_code) + data_bytes  # create PDU
-        self.__transaction_id = random.randint(0, 65535)
+        transaction_id = random.randint(0, 65535)
         message_length = 1 + len(body)
-        header = struct.pack(">HHHB", self.__transaction_id, self.__protocol_id, message_length, self.__unit_id)
+        header = struct.pack(">HHHB", transaction_id, self.__protocol_id, message_length, self.__unit_id)
         return header + body
 
     def _send(self, adu):
@@ -180,32 +327,35 @@ class ModbusTCP:
         :param adu: The data to send over the socket
         :return: Bytes response from the other end of the socket
         """
-        self.open()
-        self.connection.send(adu)
-        response = self.connection.receive()
-        self.close()
+        with self.__send_lock:
+            self.open()
+            self.connection.send(adu)
+            response = self.connection.receive()
+            self.close()
 
         if self.pretty_print_response:
             self.pretty_print(response)
 
-        if self._error_check(response):
+        transaction_id = struct.unpack(">H", adu[:2])[0]
+        if self._error_check(response, transaction_id):
             return None
         return response
 
-    def _error_check(self, response):
+    def _error_check(self, response, transaction_id):
         """ Check if the frame is void of errors
 
         Raises an exception termination the program
         :param response: The ADU to check
+        :param transaction_id: Transaction identifier of the request
         :return: None
         """
         mbap = response[:7]
         function_code = response[7:8]
         mbap = struct.unpack(">HHHB", mbap)
 
-        if mbap[0] != self.__transaction_id:
+        if mbap[0] != transaction_id:
             print("Modbus: Transaction ID mismatch"
-                  "\n - Send: {} \n - Response: {}".format(self.__transaction_id, mbap[0]))
+                  "\n - Send: {} \n - Response: {}".format(transaction_id, mbap[0]))
             return True
         elif mbap[1] != self.__protocol_id:
             print("Modbus: Protocol ID mismatch"
@@ -235,6 +385,15 @@ class ModbusTCP:
         """
         self.pretty_print_response = value
 
+    def set_cache_ttl(self, seconds):
+        """
+        Reuse read responses for a short period, so many readers cost one request per period
+        :param seconds: Float, time a read response is reused. 0 disables the cache
+        """
+        with self.__read_lock:
+            self.cache_ttl = seconds
+            self.__cache.clear()
+
     @staticmethod
     def pretty_print(response):
         """ Print Response in the console
@@ -45,7 +45,6 @@ class SocketConnection:
             if send == 0:
                 raise RuntimeError("socket connection broken")
             total_send = total_send + send
-        self.s.send(message)
 
     def receive(self):
         """
@@ -2,6 +2,8 @@ import cv2
 import numpy as np
 import time
 
+from Robot.PickScheduler import PickScheduler
+from Robot.SearchPlanner import SearchPlanner
 from Robot.UR.URRobot import URRobot
 from Vision.Camera import Camera
 
@@ -27,8 +29,8 @@ def process_frame(frame):
 	:param frame: frame to process
 	:return: processed frame and the found circles
 	"""
-	# process the snapshot
-	gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+	# process the snapshot, a GRAY8 camera stream is already grayscale
+	gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 	median_blur = cv2.medianBlur(gray, 5, 5)
 	# use canny, as HoughCircles seems to prefer ring like circles to filled ones.
 	canny = cv2.Canny(median_blur, 100, 150)
@@ -55,27 +57,23 @@ def process_frame(frame):
 
 # Todo: Create class around the get_camera_position_data function
 # Todo: Create offset input for the camera
-def get_camera_position_data(tcp_position, circles):
+def get_camera_position_data(tcp_position, circle):
 	"""
 	Finds the position data for the TCP based on its current position to center the TCP on the object.
 	:param tcp_position: current tcp position (vector and axis)
-	:param circles: circle data to process
+	:param circle: circle data (x, y, radius) to process
 	:return: Positional data (vector and axis)
 	"""
-	x_offset = ""
-	y_offset = ""
-
 	print("\nCircle Found, Calculating offset...")
 	print("Current TCP position:")
 	print(tcp_position)
 
 	tcp_position = list(tcp_position)
 
-	circles = np.round(circles[0, :]).astype("int")
-	for (_x, _y, _r) in circles:
-		print("Circle center on Camera: \n - X: " + str(_x) + " \n - Y: " + str(+ _y))
-		x_offset = (1280 / 2) - _x
-		y_offset = (720 / 2) - _y
+	(_x, _y, _r) = circle
+	print("Circle center on Camera: \n - X: " + str(_x) + " \n - Y: " + str(+ _y))
+	x_offset = (1280 / 2) - _x
+	y_offset = (720 / 2) - _y
 
 	# Offset calculation
 	minus_x = True if x_offset < 0 else False
@@ -106,85 +104,56 @@ def get_camera_position_data(tcp_position, circles):
 	return tcp_position
 
 
-def bin_picking_2d_coin():
-	state = 0
-	circles = None
-
-	while True:
-		key = cv2.waitKey(1)
-
-		# Processes a camera frame to look for circles
-		if key == 102:  # f
-			frame = camera.read()  # create snapshot for processing
-			frame, circles = process_frame(frame)  # process the frame and search for circles
-
-		elif key == 32:  # space
-			# Circle has been found, time to pick it up
-			# Take note that we can only work with 1 circle
-			# if multiple circles have been found  we will reposition
-			if circles is not None and len(circles) == 1:
-
-				# Align the TCP with the object
-				tcp_position = robot.get_tcp_position()
-				pose = get_camera_position_data(tcp_position, circles)
-				robot.movel(pose)
-				time.sleep(4)
-
-				# Enable the magnet
-				robot.set_io(8, True)
-				time.sleep(1)
-
-				# Go to drop-off point
-				robot.movel((0.1, -0.75, 0.025, 0, 3.14, 0))
-
-				print("\nWait for drop")
-				print("Using modbus to get current position to see if robot is @drop-off point")
-				while True:
-					pos = robot.get_tcp_position()
-					# Check if X and Y are in drop-off range
-					if 98 <= abs(pos[0]) <= 102 and 748 <= abs(pos[1]) <= 752:
-						break
-					else:
-						time.sleep(2)
-				robot.set_io(8, False)
-				print("Dropped\n")
-
-				circles = None
-				state = -1
-
-			# No circle has been found so reposition
-			else:
-				time.sleep(1)
-				print("No circle found, repositioning..")
-				if state is 0:
-					robot.translate((-0.15, 0, 0))
-					state = 1
-					print("search 0")
-				elif state is 1:
-					robot.translate((-0.15, 0, 0))
-					state = 2
-					print("search 1")
-				elif state is 2:
-					robot.translate((0, -0.15, 0))
-					state = 3
-					print("search 2")
-				elif state is 3:
-					robot.translate((0.15, 0, 0))
-					state = 4
-					print("search 3")
-				elif state is 4:
-					robot.translate((0.15, 0, 0))
-					state = -1
-					print("search 4")
-				else:
-					robot.movel((0.3, -1.0, 0.2, 0.0, 3.14, 0.0))
-					print("Returning Home")
-					state = 0
-		elif key == 27:  # escape
-			camera.stop_view()
-			camera.stop()
-			break
+def find_coins(frame, tcp_position):
+	"""
+	Find the coins in a camera frame
+	:param frame: frame to process
+	:param tcp_position: tcp position at the time the frame was captured
+	:return: Positional data to pick each coin, None if no coin has been found
+	"""
+	frame, circles = process_frame(frame)  # process the frame and search for circles
+
+	if circles is None:
+		return None
+	# Multiple coins are picked in one go, ordered by the shortest route
+	circles = np.round(circles[0, :]).astype("int")
+	return [get_camera_position_data(tcp_position, circle) for circle in circles]
 
+
+# Sweeps the area around the starting position, the camera keeps detecting while the robot moves
+sweep = SearchPlanner(robot, camera, find_coins, workspace=(-0.08, -1.29, 0.38, -0.86), height=0.2)
+
+
+def detect_coins():
+	"""
+	Detect the coins in the next camera frame, also while the robot moves
+	:return: Positional data to pick each coin, None if no coin has been found
+	"""
+	# snapshot for processing with the tcp position at the time it was taken
+	frame, tcp_position = sweep.capture()
+	if frame is None:
+		return None
+	return find_coins(frame, tcp_position)
+
+
+def bin_picking_2d_coin():
+	# Detection of the next coins runs while the robot travels to the drop-off point,
+	# the magnet is switched when the robot arrives
+	scheduler = PickScheduler(robot, detect_coins, drop_pose=(0.1, -0.75, 0.025, 0, 3.14, 0), gripper_io=8)
+
+	def search():
+		# No circle has been found, sweep until one is found
+		print("No circle found, searching..")
+		scheduler.next_target = sweep.search()
+		if scheduler.next_target is None:
+			robot.movel((0.3, -1.0, 0.2, 0.0, 3.14, 0.0))
+			print("Returning Home")
+
+	# Escape stops after the current cycle
+	scheduler.run(on_miss=search, stop=lambda: cv2.waitKey(1) == 27)
+	scheduler.print_report()
+
+	camera.stop()
 	cv2.destroyAllWindows()
 	robot.secondaryInterface.disconnect()
 
@@ -0,0 +1,308 @@
+import time
+from threading import Thread
+
+from Robot.RoutePlanner import RoutePlanner
+
+
+class PickAborted(RuntimeError):
+    """
+    Raised when a cycle cannot be completed while the gripper holds a target
+    """
+
+
+class PickScheduler:
+    """
+    Pick and place cycle scheduler that overlaps the stages of consecutive picks
+
+    A cycle consists of the stages:
+    - detect: find the next target (skipped if it was found during the previous transport)
+    - approach: move to the target and wait for arrival
+    - grip: enable the gripper IO and wait for it to settle
+    - transport: move to the drop-off point, meanwhile the next target is detected
+    - release: disable the gripper IO and wait for it to settle
+
+    When detect returns multiple targets they are all picked in a single cycle (stage: route).
+    The targets are ordered by :class:`RoutePlanner` and sent as one blended program.
+    The next targets are detected once the robot has picked the last target and left it.
+
+    Detections within picked_tolerance of the targets that were just picked are dropped,
+    frames taken before the robot moved away may still show them.
+
+    IO is switched on arrival, detected by polling the TCP position, instead of after a fixed sleep.
+    A target is only released at the drop-off point. If the robot cannot get there while holding it,
+    the robot is stopped and run() stops as well, see :class:`PickAborted`.
+    Polling starts when the estimated duration of the move (see URRobot.estimate_movel) has passed.
+    The duration of every stage is recorded, see report().
+    """
+
+    STAGES = ("detect", "approach", "grip", "transport", "release", "route")
+
+    def __init__(self, robot, detect, drop_pose, gripper_io=8, grip_time=0.5, release_time=0.2,
+                 tolerance=2.0, poll_interval=0.05, timeout=30.0, a=None, v=None, approach_height=0.05,
+                 blend=0.02, picked_tolerance=10.0):
+        """
+        :param robot: URRobot to control
+        :param detect: function returning the pose of the next target (robot readable),
+        a list of poses of multiple targets or None
+        :param drop_pose: pose of the drop-off point (robot readable)
+        :param gripper_io: IO that enables the gripper
+        :param grip_time: time for the gripper to settle after enabling [s]
+        :param release_time: time for the gripper to settle after disabling [s]
+        :param tolerance: distance to a pose that counts as arrived [mm]
+        :param poll_interval: time between polls of the TCP position [s]
+        :param timeout: maximum time to wait for arrival [s]
+        :param a: tool acceleration [m/2^s], defaults to the acceleration of the robot
+        :param v: tool speed [m/s], defaults to the velocity of the robot
+        :param approach_height: height above a target to move down from when picking multiple targets [m]
+        :param blend: blend radius between multiple targets [m]
+        :param picked_tolerance: distance to a picked target within which a detection is that same target [mm]
+        """
+        self.robot = robot
+        self.detect = detect
+        self.drop_pose = tuple(drop_pose)
+        self.gripper_io = gripper_io
+        self.grip_time = grip_time
+        self.release_time = release_time
+        self.tolerance = tolerance
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.a = robot.acceleration if a is None else a
+        self.v = robot.velocity if v is None else v
+        self.approach_height = approach_height
+        self.blend = blend
+        self.picked_tolerance = picked_tolerance
+
+        self.timings = {stage: [] for stage in self.STAGES}
+        self.cycle_times = []
+        self.picks = 0
+        self.next_target = None
+
+    def wait_arrival(self, pose, expected=0.0, on_poll=None):
+        """
+        Poll the TCP position until it is within tolerance of the pose
+        :param pose: robot readable pose (m) to wait for
+        :param expected: estimated duration of the move [s], polling starts just before it has passed
+        :param on_poll: function called with every polled TCP position, polling then starts right away
+        :return: Boolean, False if the timeout expired
+        """
+        start = time.monotonic()
+        if on_poll is None and expected > self.poll_interval:
+            time.sleep(expected - self.poll_interval)
+        # The timeout counts from the expected arrival, so a long move is still polled
+        deadline = max(time.monotonic(), start + expected) + self.timeout
+        while time.monotonic() < deadline:
+            position = self.robot.get_tcp_position()
+            if on_poll is not None:
+                on_poll(position)
+            if self._distance(position, pose) <= self.tolerance:
+                return True
+            time.sleep(self.poll_interval)
+        print("Pick scheduler: timeout waiting for arrival at {}".format(pose))
+        return False
+
+    def run_cycle(self):
+        """
+        Run a single pick and place cycle
+        :return: Boolean, False if no target was found, a move was not sent or the robot did not arrive
+        at a target
+        :raises PickAborted: if the robot does not get to the drop-off point while holding a target
+        """
+        cycle_start = time.monotonic()
+
+        target = self.next_target
+        self.next_target = None
+        start = time.monotonic()
+        if target is None:
+            target = self.detect()
+        self._record("detect", start)
+        if target is None or len(target) == 0:
+            return False
+        if hasattr(target[0], "__len__"):
+            if len(target) > 1:
+                return self._run_route(target, cycle_start)
+            target = target[0]
+
+        start = time.monotonic()
+        expected = self.robot.estimate_movel(target, self.a, self.v)
+        if not self.robot.movel(target, self.a, self.v):
+            return False
+        arrived = self.wait_arrival(target, expected)
+        self._record("approach", start)
+        if not arrived:
+            return False
+
+        start = time.monotonic()
+        self.robot.set_io(self.gripper_io, True)
+        time.sleep(self.grip_time)
+        self._record("grip", start)
+
+        # Detect the next target while travelling to the drop-off point
+        start = time.monotonic()
+        expected = self.robot.estimate_movel(self.drop_pose, self.a, self.v)
+        if not self.robot.movel(self.drop_pose, self.a, self.v):
+            # The move was rejected or not sent, keep holding the target instead of releasing it here
+            raise PickAborted("move to the drop-off point was not sent, holding the target")
+        lookahead = Thread(target=self._detect_next, args=([target],))
+        lookahead.start()
+        arrived = self.wait_arrival(self.drop_pose, expected)
+        self._record("transport", start)
+        if not arrived:
+            self.robot.stopl()
+            lookahead.join()
+            raise PickAborted("robot did not arrive at the drop-off point, holding the target")
+
+        start = time.monotonic()
+        self.robot.set_io(self.gripper_io, False)
+        time.sleep(self.release_time)
+        self._record("release", start)
+
+        lookahead.join()
+        self.cycle_times.append(time.monotonic() - cycle_start)
+        self.picks += 1
+        return True
+
+    def _run_route(self, targets, cycle_start):
+        """
+        Pick multiple targets with a single program and drop them all at once
+        :param targets: poses of the targets
+        :param cycle_start: time the cycle started
+        :return: Boolean, False if the route was not sent
+        :raises PickAborted: if the robot does not get to the drop-off point while holding the targets
+        """
+        start = time.monotonic()
+        position = list(self.robot.get_tcp_position())
+        position[0:3] = [value / 1000 for value in position[0:3]]
+        order = RoutePlanner.order(position, targets, self.drop_pose)
+        targets = [targets[i] for i in order]
+
+        # Check the whole route against the safety limits before it is sent, in the order the program moves
+        # so the joint positions are chained through the same branches
+        waypoints = RoutePlanner.waypoints(targets, self.drop_pose, self.approach_height)
+        limits = self.robot.check_motion(waypoints, self.a, self.v)
+        if limits is None:
+            return False
+
+        program = RoutePlanner.program(targets, self.drop_pose, self.gripper_io,
+                                       self.approach_height, limits[0], limits[1], self.blend,
+                                       self.grip_time, self.release_time)
+        expected = RoutePlanner.duration(self.robot.motion_estimator, position, targets, self.drop_pose,
+                                         self.approach_height, limits[0], limits[1],
+                                         self.grip_time, self.release_time)
+        if not self.robot.run_program(program):
+            return False
+
+        # Follow the robot along the targets, the next targets are detected once it has left the last one.
+        # The program releases the targets itself once it arrives at the drop-off point
+        lookahead = Thread(target=self._detect_next, args=(targets,))
+        reached = 0
+
+        def follow(position):
+            nonlocal reached
+            if reached < len(targets):
+                if self._distance(position, targets[reached]) <= self.tolerance:
+                    reached += 1
+            elif lookahead.ident is None and \
+                    self._distance(position, targets[-1]) > self.approach_height * 1000 / 2:
+                lookahead.start()
+
+        arrived = self.wait_arrival(self.drop_pose, expected, on_poll=follow)
+        if lookahead.ident is None:
+            lookahead.start()
+        if not arrived:
+            # The gripper still holds the targets, a new program would carry them elsewhere
+            self.robot.stopl()
+            lookahead.join()
+            raise PickAborted("robot did not arrive at the drop-off point, holding the targets")
+        time.sleep(self.release_time)
+        self._record("route", start)
+
+        lookahead.join()
+        self.cycle_times.append(time.monotonic() - cycle_start)
+        self.picks += len(targets)
+        return True
+
+    def run(self, cycles=None, on_miss=None, stop=None):
+        """
+        Run pick and place cycles
+        :param cycles: number of cycles to run, None to keep running
+        :param on_miss: function called when no target has been found, e.g. to reposition the camera
+        :param stop: function returning True to stop after the current cycle
+        :return: number of picks made
+        """
+        picks = self.picks
+        completed = 0
+        while cycles is None or completed < cycles:
+            if stop is not None and stop():
+                break
+            try:
+                picked = self.run_cycle()
+            except PickAborted as error:
+                # on_miss would move the robot elsewhere while it still holds the target
+                print("Pick scheduler: aborted, {}".format(error))
+                break
+            if picked:
+                completed += 1
+            elif on_miss is not None:
+                on_miss()
+        return self.picks - picks
+
+    def report(self):
+        """
+        Summarize the recorded timings
+        :return: dict with the number of picks, the mean cycle time [s], the throughput in picks per minute and
+        the mean duration of every stage [s]
+        """
+        def mean(values):
+            return sum(values) / len(values) if values else 0.0
+
+        total_time = sum(self.cycle_times)
+        return {
+            "picks": self.picks,
+            "cycle_time": mean(self.cycle_times),
+            "picks_per_minute": 60.0 * self.picks / total_time if total_time else 0.0,
+            "stages": {stage: mean(durations) for stage, durations in self.timings.items()},
+        }
+
+    def print_report(self):
+        """
+        Print the summary of the recorded timings in the console
+        """
+        report = self.report()
+        print("+--------------------------------------+")
+        print("|     ****Pick cycle timings****       |")
+        print("+--------------------------------------+")
+        print("| Picks: {}".format(report["picks"]))
+        print("| Cycle time: {:.2f} s".format(report["cycle_time"]))
+        print("| Throughput: {:.1f} picks/min".format(report["picks_per_minute"]))
+        print("+--------------------------------------+")
+        for stage, duration in report["stages"].items():
+            print("| {}: {:.2f} s".format(stage, duration))
+        print("+--------------------------------------+")
+
+    def _detect_next(self, picked):
+        """
+        Detect the next target, dropping detections of the targets that were just picked
+        :param picked: poses of the targets that were just picked
+        """
+        target = self.detect()
+        if target is not None and len(target) and hasattr(target[0], "__len__"):
+            target = [pose for pose in target if not self._is_picked(pose, picked)] or None
+        elif target is not None and len(target) and self._is_picked(target, picked):
+            target = None
+        self.next_target = target
+
+    def _is_picked(self, pose, picked):
+        return any(self._distance([value * 1000 for value in pose[:3]], target) <= self.picked_tolerance
+                   for target in picked)
+
+    @staticmethod
+    def _distance(position, pose):
+        """
+        :param position: TCP position as returned by URRobot.get_tcp_position() (mm)
+        :param pose: robot readable pose (m)
+        :return: distance between the positions [mm]
+        """
+        return sum((position[i] - pose[i] * 1000) ** 2 for i in range(3)) ** 0.5
+
+    def _record(self, stage, start):
+        self.timings[stage].append(time.monotonic() - start)
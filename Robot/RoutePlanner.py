@@ -0,0 +1,131 @@
+from Robot.UR.URScript import URScript
+
+
+class RoutePlanner:
+    """
+    Plans the order in which multiple targets are picked
+
+    The route starts at the current position, visits every target once and ends at the drop-off point.
+    It is built with the nearest neighbour heuristic and improved with 2-opt until no
+    reversal of a part of the route makes it shorter.
+    Distances are measured between the positions (x, y, z) of the poses.
+    """
+
+    @staticmethod
+    def order(start, targets, end):
+        """
+        Order the targets to minimize the travel from start, past all targets, to end
+        :param start: pose the route starts at
+        :param targets: poses to visit
+        :param end: pose the route ends at, e.g. the drop-off point
+        :return: list of the indices of the targets in the order to visit them
+        """
+        points = [tuple(start[:3])] + [tuple(target[:3]) for target in targets] + [tuple(end[:3])]
+        count = len(targets)
+
+        def distance(i, j):
+            return sum((points[i][k] - points[j][k]) ** 2 for k in range(3)) ** 0.5
+
+        # Nearest neighbour, point 0 is the start and point count + 1 is the end
+        route = [0]
+        unvisited = set(range(1, count + 1))
+        while unvisited:
+            nearest = min(unvisited, key=lambda i: distance(route[-1], i))
+            route.append(nearest)
+            unvisited.remove(nearest)
+        route.append(count + 1)
+
+        # 2-opt, reverse route[i:j + 1] if that shortens the route. Start and end stay in place
+        improved = True
+        while improved:
+            improved = False
+            for i in range(1, count):
+                for j in range(i + 1, count + 1):
+                    before = distance(route[i - 1], route[i]) + distance(route[j], route[j + 1])
+                    after = distance(route[i - 1], route[j]) + distance(route[i], route[j + 1])
+                    if after < before - 1e-9:
+                        route[i:j + 1] = reversed(route[i:j + 1])
+                        improved = True
+
+        return [i - 1 for i in route[1:-1]]
+
+    @staticmethod
+    def length(start, targets, end):
+        """
+        :param start: pose the route starts at
+        :param targets: poses in the order they are visited
+        :param end: pose the route ends at
+        :return: total distance travelled along the route
+        """
+        points = [start] + list(targets) + [end]
+        return sum(sum((a[k] - b[k]) ** 2 for k in range(3)) ** 0.5 for a, b in zip(points, points[1:]))
+
+    @staticmethod
+    def waypoints(targets, drop_pose, approach_height=0.05):
+        """
+        Poses the program moves to, in the order it moves to them
+        :param targets: poses of the targets (robot readable) in the order to pick them
+        :param drop_pose: pose of the drop-off point (robot readable)
+        :param approach_height: height above a target the robot moves down from [m]
+        :return: list of poses: above, target and above again for every target, followed by the drop-off point
+        """
+        waypoints = []
+        for target in targets:
+            above = list(target)
+            above[2] += approach_height
+            waypoints += [above, list(target), above]
+        waypoints.append(list(drop_pose))
+        return waypoints
+
+    @staticmethod
+    def duration(estimator, start, targets, drop_pose, approach_height=0.05, a=0.1, v=0.1,
+                 grip_time=0.5, release_time=0.2):
+        """
+        Estimate the duration of the program
+
+        Blends are not taken into account, so the program finishes somewhat earlier than estimated.
+        :param estimator: URMotionEstimator
+        :param start: pose (robot readable) the program starts at
+        :param targets: poses of the targets in the order to pick them
+        :return: duration [s], including the grip and release time
+        """
+        poses = [start] + RoutePlanner.waypoints(targets, drop_pose, approach_height)
+        moves = sum(estimator.movel(a_pose, b_pose, a, v) for a_pose, b_pose in zip(poses, poses[1:]))
+        return moves + grip_time * len(targets) + release_time
+
+    @staticmethod
+    def program(targets, drop_pose, gripper_io, approach_height=0.05, a=0.1, v=0.1, blend=0.02,
+                grip_time=0.5, release_time=0.2, name="pick_route"):
+        """
+        Create a single program that picks all targets and drops them at the drop-off point
+
+        The gripper (e.g. a magnet) is enabled at the start and collects the targets one by one.
+        Every target is approached from above, the points above the targets are blended so the
+        robot does not stop between targets.
+        :param targets: poses of the targets (robot readable) in the order to pick them
+        :param drop_pose: pose of the drop-off point (robot readable)
+        :param gripper_io: IO that enables the gripper, numbered like URRobot.set_io
+        :param approach_height: height above a target the robot moves down from [m]
+        :param a: tool acceleration [m/2^s]
+        :param v: tool speed [m/s]
+        :param blend: blend radius of the points above the targets [m]
+        :param grip_time: time at a target for the gripper to grip [s]
+        :param release_time: time at the drop-off point for the gripper to release [s]
+        :param name: name of the program
+        :return: string containing the program script
+        """
+        # The blends must not overlap on the way down and up
+        blend = min(blend, approach_height / 2)
+
+        waypoints = RoutePlanner.waypoints(targets, drop_pose, approach_height)
+        lines = [URScript.set_io(gripper_io, True)]
+        # Every target is three waypoints: above, target and above again
+        for i in range(0, len(waypoints) - 1, 3):
+            lines.append(URScript.movel(waypoints[i], a, v, r=blend))
+            lines.append(URScript.movel(waypoints[i + 1], a, v))
+            lines.append(URScript.sleep(grip_time))
+            lines.append(URScript.movel(waypoints[i + 2], a, v, r=blend))
+        lines.append(URScript.movel(waypoints[-1], a, v))
+        lines.append(URScript.set_io(gripper_io, False))
+        lines.append(URScript.sleep(release_time))
+        return URScript.program(name, lines)
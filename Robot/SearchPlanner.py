@@ -0,0 +1,196 @@
+import time
+from collections import deque
+
+from Robot.UR.URScript import URScript
+
+
+class SearchPlanner:
+    """
+    Searches a workspace with a continuous sweep of the camera instead of stop-and-look
+
+    The sweep runs back and forth in lanes along the x-axis, spaced so that the camera views of
+    neighbouring lanes overlap. It is sent to the robot as one blended program.
+    While the robot moves every new frame is passed to the detector together with the TCP position
+    at the time the frame was captured. The sweep stops as soon as something is detected.
+
+    The capture time of a frame is the time it was received minus the latency of the camera,
+    the TCP position is interpolated between the positions sampled around it, see capture().
+    """
+
+    HISTORY = 32    # Number of TCP positions kept during the sweep to interpolate frames with
+
+    def __init__(self, robot, camera, detect, workspace, height, orientation=(0, 3.14, 0),
+                 footprint=(0.16, 0.285), overlap=0.2, a=None, v=None, blend=0.05, tolerance=2.0,
+                 camera_latency=0.0):
+        """
+        :param robot: URRobot to control
+        :param camera: started Camera to read frames from
+        :param detect: function called with (frame, tcp_position) returning the detected targets or None
+        :param workspace: area to search (x_min, y_min, x_max, y_max) [m]
+        :param height: height of the TCP during the sweep [m]
+        :param orientation: axis-angle of the TCP during the sweep [rad]
+        :param footprint: area seen by the camera along the x and y axis [m]
+        :param overlap: fraction the camera views of neighbouring lanes overlap
+        :param a: tool acceleration [m/2^s], defaults to the acceleration of the robot
+        :param v: tool speed [m/s], defaults to the velocity of the robot
+        :param blend: blend radius at the turns of the sweep [m]
+        :param tolerance: distance to the end of the sweep that counts as arrived [mm]
+        :param camera_latency: time between the capture and the reception of a frame [s],
+        see Camera.measure_latency()
+        """
+        self.robot = robot
+        self.camera = camera
+        self.detect = detect
+        self.workspace = tuple(workspace)
+        self.height = height
+        self.orientation = tuple(orientation)
+        self.footprint = tuple(footprint)
+        self.overlap = overlap
+        self.a = robot.acceleration if a is None else a
+        self.v = robot.velocity if v is None else v
+        self.blend = blend
+        self.tolerance = tolerance
+        self.camera_latency = camera_latency
+
+    def waypoints(self):
+        """
+        Positions of the camera that cover the workspace, lane by lane
+        :return: list of poses (robot readable)
+        """
+        x_min, y_min, x_max, y_max = self.workspace
+
+        def centers(low, high, size, step):
+            # Positions of the camera center that cover [low, high] with views of size
+            first, last = low + size / 2, high - size / 2
+            if last <= first:
+                return [(low + high) / 2]
+            count = int((last - first) // step + 1)
+            if first + (count - 1) * step < last - 1e-9:
+                count += 1
+            return [first + (last - first) * i / (count - 1) for i in range(count)]
+
+        lanes = centers(y_min, y_max, self.footprint[1], self.footprint[1] * (1 - self.overlap))
+        x_start, x_end = x_min + self.footprint[0] / 2, x_max - self.footprint[0] / 2
+        if x_end < x_start:
+            x_start = x_end = (x_min + x_max) / 2
+
+        waypoints = []
+        for i, y in enumerate(lanes):
+            for x in ((x_start, x_end) if i % 2 == 0 else (x_end, x_start)):
+                if not waypoints or waypoints[-1][:2] != (x, y):
+                    waypoints.append((x, y, self.height) + self.orientation)
+        return waypoints
+
+    def program(self, waypoints=None, a=None, v=None):
+        """
+        Create the blended program that sweeps the workspace
+        :param waypoints: poses of the sweep, defaults to waypoints()
+        :param a: tool acceleration [m/2^s], defaults to the acceleration of the planner
+        :param v: tool speed [m/s], defaults to the velocity of the planner
+        :return: string containing the program script
+        """
+        if waypoints is None:
+            waypoints = self.waypoints()
+        a = self.a if a is None else a
+        v = self.v if v is None else v
+
+        # The blends of neighbouring waypoints must not overlap
+        blend = self.blend
+        for start, end in zip(waypoints, waypoints[1:]):
+            blend = min(blend, sum((start[k] - end[k]) ** 2 for k in range(3)) ** 0.5 / 2)
+
+        lines = [URScript.movel(pose, a, v, r=blend if i < len(waypoints) - 1 else 0)
+                 for i, pose in enumerate(waypoints)]
+        return URScript.program("search_sweep", lines)
+
+    def search(self, timeout=60.0):
+        """
+        Sweep the workspace until something is detected
+        :param timeout: maximum duration of the sweep [s]
+        :return: result of detect, None if nothing has been detected
+        """
+        waypoints = self.waypoints()
+        # The sweep runs at the acceleration and velocity clamped to the safety limits
+        limits = self.robot.check_motion(waypoints, self.a, self.v)
+        if limits is None:
+            return None
+        if not self.robot.run_program(self.program(waypoints, limits[0], limits[1])):
+            return None
+        end = waypoints[-1]
+
+        # Every frame gets the TCP position at its capture time, interpolated between the sampled positions
+        samples = deque([self._sample()], maxlen=self.HISTORY)
+        frame_index = self.camera.frame_index
+        arrived_time = None
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            stamped = self.camera.read_next(frame_index, max(deadline - time.monotonic(), 0))
+            if stamped is None:
+                break
+            frame, frame_time, frame_index = stamped
+            capture_time = frame_time - self.camera_latency
+            position_time, position = self._sample()
+            samples.append((position_time, position))
+
+            targets = self.detect(frame, self._position_at(samples, capture_time))
+            if targets:
+                self.robot.stopl()
+                return targets
+
+            # Stop after a frame captured at the end of the sweep has been checked
+            if arrived_time is None:
+                if sum((position[k] - end[k] * 1000) ** 2 for k in range(3)) ** 0.5 <= self.tolerance:
+                    arrived_time = position_time
+            elif capture_time >= arrived_time:
+                break
+        return None
+
+    def capture(self, timeout=1.0):
+        """
+        Wait for the next frame and the TCP position at the time it was captured
+        For a single detection while the robot moves, e.g. the lookahead of :class:`PickScheduler`.
+        The TCP position is sampled before and after the capture and interpolated to the capture time,
+        frames captured before the first sample are skipped.
+        :param timeout: maximum time to wait for the frame [s]
+        :return: tuple (frame, tcp_position), (None, None) if no frame arrived in time
+        """
+        deadline = time.monotonic() + timeout
+        samples = [self._sample()]
+        frame_index = self.camera.frame_index
+        while True:
+            stamped = self.camera.read_next(frame_index, max(deadline - time.monotonic(), 0))
+            if stamped is None:
+                return None, None
+            frame, frame_time, frame_index = stamped
+            capture_time = frame_time - self.camera_latency
+            if capture_time >= samples[0][0]:
+                break
+        samples.append(self._sample())
+        return frame, self._position_at(samples, capture_time)
+
+    def _sample(self):
+        """
+        Read the TCP position, stamped halfway the round trip of the request
+        :return: tuple (time, tcp_position)
+        """
+        start = time.monotonic()
+        position = self.robot.get_tcp_position()
+        return (start + time.monotonic()) / 2, position
+
+    @staticmethod
+    def _position_at(samples, at):
+        """
+        Linear interpolation between the two TCP positions sampled around a time
+        :param samples: tuples (time, tcp_position) in order of time
+        :param at: time to interpolate to
+        :return: tuple of the TCP position at time at, the nearest sample if at is outside the samples
+        """
+        for (time_a, position_a), (time_b, position_b) in zip(samples, list(samples)[1:]):
+            if at <= time_b:
+                break
+        else:
+            return tuple(samples[-1][1])
+        if at <= time_a:
+            return tuple(position_a)
+        f = (at - time_a) / (time_b - time_a)
+        return tuple(a + (b - a) * f for a, b in zip(position_a, position_b))
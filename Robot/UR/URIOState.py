@@ -0,0 +1,91 @@
+class URIOState:
+    """Snapshot of the digital IO of the UR
+
+    The IO are stored as bits of a single integer, bit n being coil n of the snapshot.
+    The snapshot holds the inputs (0-15) followed by the outputs (16-31),
+    matching the coil addresses of the Modbus server.
+
+    Reading a bit is O(1) and comparing two snapshots is a single XOR,
+    so snapshots can be taken at a high rate to detect changing IO.
+    """
+    __slots__ = ('bits', 'count', 'timestamp')
+
+    OUTPUT_OFFSET = 16
+
+    def __init__(self, bits=0, count=32, timestamp=None):
+        """
+        :param bits: Integer holding the state of the IO, bit n is coil n
+        :param count: Number of coils in the snapshot
+        :param timestamp: Time the snapshot was taken
+        """
+        self.bits = bits
+        self.count = count
+        self.timestamp = timestamp
+
+    @classmethod
+    def from_coils(cls, coil_bytes, count, timestamp=None):
+        """
+        Decode the data bytes of a read coils response
+        Coils are packed eight per byte, the first coil in the least significant bit
+        :param coil_bytes: Data bytes of the response (without the byte count)
+        :param count: Number of coils requested
+        :param timestamp: Time the snapshot was taken
+        :return: URIOState
+        """
+        bits = int.from_bytes(coil_bytes, 'little') & ((1 << count) - 1)
+        return cls(bits, count, timestamp)
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError("IO {} is outside the snapshot 0-{}".format(index, self.count - 1))
+        return bool(self.bits >> index & 1)
+
+    def __len__(self):
+        return self.count
+
+    def __eq__(self, other):
+        return isinstance(other, URIOState) and self.bits == other.bits and self.count == other.count
+
+    def __hash__(self):
+        return hash((self.bits, self.count))
+
+    def __repr__(self):
+        return "URIOState(inputs={:016b}, outputs={:016b})".format(
+            self.bits & 0xFFFF, self.bits >> self.OUTPUT_OFFSET & 0xFFFF)
+
+    def input(self, io):
+        """
+        :param io: The digital input as INT (0-7 standard, 8-15 configurable)
+        :return: Boolean state of the input
+        """
+        return self[io]
+
+    def output(self, io):
+        """
+        :param io: The digital output as INT (0-7 standard, 8-15 configurable)
+        :return: Boolean state of the output
+        """
+        return self[self.OUTPUT_OFFSET + io]
+
+    def diff(self, previous):
+        """
+        Compare with a previous snapshot
+        :param previous: URIOState taken earlier, None is treated as all IO off
+        :return: Tuple of bit masks (rising, falling) of the IO that changed
+        """
+        previous_bits = 0 if previous is None else previous.bits
+        changed = self.bits ^ previous_bits
+        return changed & self.bits, changed & previous_bits
+
+    def changes(self, previous):
+        """
+        Iterate the IO that changed since a previous snapshot
+        :param previous: URIOState taken earlier, None is treated as all IO off
+        :return: Generator of (index, value) tuples, index being the coil in the snapshot
+        """
+        changed = self.bits ^ (0 if previous is None else previous.bits)
+        while changed:
+            low_bit = changed & -changed
+            index = low_bit.bit_length() - 1
+            yield index, bool(self.bits & low_bit)
+            changed ^= low_bit
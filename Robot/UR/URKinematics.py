@@ -0,0 +1,319 @@
+import math
+
+from Utils.LazyModule import LazyModule
+
+np = LazyModule("numpy")
+
+# Denavit-Hartenberg parameters of the UR robots in metre, as published by Universal Robots.
+# Every joint i transforms with Rz(theta_i) * Tz(d_i) * Tx(a_i) * Rx(alpha_i).
+# The alpha parameters are the same for all models: [pi/2, 0, 0, pi/2, -pi/2, 0]
+#
+# Joint positions (q) are lists of 6 floats in radians, poses consist of a position vector in metre
+# followed by an axis-angle in radians, in the same way as URScript.
+
+DH_PARAMETERS = {
+    # model: (d1, a2, a3, d4, d5, d6)
+    "UR3": (0.1519, -0.24365, -0.21325, 0.11235, 0.08535, 0.0819),
+    "UR5": (0.089159, -0.425, -0.39225, 0.10915, 0.09465, 0.0823),
+    "UR10": (0.1273, -0.612, -0.5723, 0.163941, 0.1157, 0.0922),
+    "UR3e": (0.15185, -0.24355, -0.2132, 0.13105, 0.08535, 0.0921),
+    "UR5e": (0.1625, -0.425, -0.3922, 0.1333, 0.0997, 0.0996),
+    "UR10e": (0.1807, -0.6127, -0.57155, 0.17415, 0.11985, 0.11655),
+}
+
+ALPHA = (math.pi / 2, 0, 0, math.pi / 2, -math.pi / 2, 0)
+
+
+
+class URKinematics:
+    """Forward and inverse kinematics of the UR robots
+
+    All functions take batches: an array of N joint positions (N, 6) or N poses (N, 6).
+    A single joint position or pose (6,) is also accepted and returns a single result.
+    The inverse kinematics are analytic, every pose has up to 8 solutions
+    (shoulder left/right, wrist up/down, elbow up/down).
+    """
+
+    def __init__(self, model="UR5", tcp=(0, 0, 0, 0, 0, 0)):
+        """
+        :param model: robot model, one of DH_PARAMETERS (UR3, UR5, UR10, UR3e, UR5e, UR10e)
+        :param tcp: Tool Center Point as set with URRobot.set_tcp(), offset from the flange as a pose
+        """
+        if model not in DH_PARAMETERS:
+            raise ValueError("Unknown model {}, expected one of {}".format(model, ", ".join(DH_PARAMETERS)))
+        self.model = model
+        d1, a2, a3, d4, d5, d6 = DH_PARAMETERS[model]
+        self.d = np.array([d1, 0, 0, d4, d5, d6])
+        self.a = np.array([0, a2, a3, 0, 0, 0])
+        self.set_tcp(tcp)
+
+    def set_tcp(self, tcp):
+        """
+        :param tcp: Tool Center Point, offset from the flange as a pose
+        """
+        self.tcp = self.pose_to_matrix(tcp)
+        self.tcp_inverse = np.linalg.inv(self.tcp)
+
+    def forward(self, q):
+        """
+        Forward kinematics
+        :param q: joint positions (N, 6) or (6,) [rad]
+        :return: poses of the TCP (N, 6) or (6,)
+        """
+        return self.matrix_to_pose(self.forward_matrix(q))
+
+    def forward_matrix(self, q):
+        """
+        Forward kinematics
+        :param q: joint positions (N, 6) or (6,) [rad]
+        :return: transformations from base to TCP (N, 4, 4) or (4, 4)
+        """
+        q = np.asarray(q, dtype=float)
+        T = self._joint_transforms(q.reshape(-1, 6))
+        result = T[:, 0]
+        for i in range(1, 6):
+            result = result @ T[:, i]
+        result = result @ self.tcp
+        return result.reshape(q.shape[:-1] + (4, 4))
+
+    def inverse_all(self, pose):
+        """
+        All solutions of the inverse kinematics
+        :param pose: poses of the TCP (N, 6) or (6,)
+        :return: joint positions (N, 8, 6) or (8, 6) [rad] in the range (-pi, pi], NaN if a solution does not exist
+        """
+        pose = np.asarray(pose, dtype=float)
+        T = self.pose_to_matrix(pose.reshape(-1, 6)) @ self.tcp_inverse
+        return self._inverse(T).reshape(pose.shape[:-1] + (8, 6))
+
+    def inverse(self, pose, q_near=None):
+        """
+        Inverse kinematics, picks the solution closest to q_near
+
+        The joint positions are unwrapped towards q_near, so they can lie outside (-pi, pi].
+        :param pose: poses of the TCP (N, 6) or (6,)
+        :param q_near: joint positions to stay close to (N, 6) or (6,), e.g. the current joint positions.
+        Defaults to all zeros
+        :return: joint positions (N, 6) or (6,) [rad], NaN if the pose is unreachable
+        """
+        pose = np.asarray(pose, dtype=float)
+        solutions = self.inverse_all(pose.reshape(-1, 6))
+        if q_near is None:
+            q_near = np.zeros(6)
+        q_near = np.broadcast_to(np.asarray(q_near, dtype=float), (len(solutions), 6))
+
+        # Shortest angular distance to q_near for every joint of every solution
+        delta = (solutions - q_near[:, None, :] + np.pi) % (2 * np.pi) - np.pi
+        distance = np.abs(delta).sum(axis=2)
+        distance = np.where(np.isnan(distance), np.inf, distance)
+        best = np.argmin(distance, axis=1)
+
+        rows = np.arange(len(solutions))
+        q = q_near + delta[rows, best]
+        q[np.isinf(distance[rows, best])] = np.nan
+        return q.reshape(pose.shape[:-1] + (6,))
+
+    def inverse_path(self, poses, q_start=None):
+        """
+        Inverse kinematics of consecutive waypoints, every solution is picked closest to the previous one
+
+        Follows the branches the controller moves through when it runs the waypoints one after the other.
+        :param poses: poses of the TCP (N, 6) or (6,)
+        :param q_start: joint positions before the first waypoint (6,), e.g. the current joint positions.
+        Defaults to all zeros
+        :return: joint positions (N, 6) [rad], NaN if a pose is unreachable
+        """
+        solutions = self.inverse_all(np.asarray(poses, dtype=float).reshape(-1, 6))
+        count = len(solutions)
+        q = np.full((count, 6), np.nan)
+        q_near = np.zeros(6) if q_start is None else np.asarray(q_start, dtype=float)
+        i = 0
+        while i < count:
+            delta = (solutions[i] - q_near + np.pi) % (2 * np.pi) - np.pi
+            distance = np.abs(delta).sum(axis=1)
+            if np.isnan(distance).all():
+                # An unreachable waypoint is skipped, the next one continues from the last solution
+                i += 1
+                continue
+            branch = np.nanargmin(distance)
+            q[i] = q_near + delta[branch]
+
+            # The branch is followed as long as it stays the solution closest to the previous waypoint,
+            # it only changes near a singularity or an unreachable waypoint
+            path = solutions[i:, branch]
+            step = (solutions[i + 1:] - path[:-1, None, :] + np.pi) % (2 * np.pi) - np.pi
+            distance = np.abs(step).sum(axis=2)
+            distance = np.where(np.isnan(distance), np.inf, distance)
+            follows = (np.argmin(distance, axis=1) == branch) & np.isfinite(distance[:, branch])
+            followed = len(follows) if follows.all() else np.argmin(follows)
+            q[i:i + followed + 1] = np.unwrap(np.concatenate([q[i:i + 1], path[1:followed + 1]]), axis=0)
+            q_near = q[i + followed]
+            i += followed + 1
+        return q
+
+    def reachable(self, pose):
+        """
+        :param pose: poses of the TCP (N, 6) or (6,)
+        :return: Boolean array (N,), True if the pose has a solution
+        """
+        return ~np.isnan(self.inverse_all(pose)).any(axis=-1).all(axis=-1)
+
+    def _joint_transforms(self, q):
+        """
+        Transformations of the individual joints
+        :param q: joint positions (N, 6)
+        :return: transformations (N, 6, 4, 4)
+        """
+        ct, st = np.cos(q), np.sin(q)
+        ca, sa = np.cos(ALPHA), np.sin(ALPHA)
+        T = np.zeros(q.shape + (4, 4))
+        T[..., 0, 0] = ct
+        T[..., 0, 1] = -st * ca
+        T[..., 0, 2] = st * sa
+        T[..., 0, 3] = self.a * ct
+        T[..., 1, 0] = st
+        T[..., 1, 1] = ct * ca
+        T[..., 1, 2] = -ct * sa
+        T[..., 1, 3] = self.a * st
+        T[..., 2, 1] = sa
+        T[..., 2, 2] = ca
+        T[..., 2, 3] = self.d
+        T[..., 3, 3] = 1
+        return T
+
+    def _inverse(self, T):
+        """
+        Analytic inverse kinematics of the flange
+        :param T: transformations from base to flange (N, 4, 4)
+        :return: joint positions (N, 8, 6), NaN if a solution does not exist
+        """
+        d4, d6 = self.d[3], self.d[5]
+        a2, a3 = self.a[1], self.a[2]
+
+        # Joint 1: the wrist center (origin of joint 5) lies in a plane at distance d4 of the base z-axis
+        p05 = T[:, :3, 3] - d6 * T[:, :3, 2]
+        radius = np.hypot(p05[:, 0], p05[:, 1])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            phi = np.arccos(d4 / radius)
+        base = np.arctan2(p05[:, 1], p05[:, 0]) + np.pi / 2
+        theta1 = np.stack([base + phi, base - phi], axis=1)                     # (N, 2)
+
+        # Joint 5: from the position of the flange along the axis of joint 1
+        s1, c1 = np.sin(theta1), np.cos(theta1)
+        p06 = T[:, None, :3, 3]
+        cos5 = (p06[..., 0] * s1 - p06[..., 1] * c1 - d4) / d6
+        with np.errstate(invalid="ignore"):
+            theta5 = np.arccos(np.where(np.abs(cos5) > 1 + 1e-9, np.nan, np.clip(cos5, -1, 1)))
+        theta5 = np.stack([theta5, -theta5], axis=2)                            # (N, 2, 2)
+
+        # Joint 6: from the orientation of the flange, arbitrary (0) if the wrist is singular
+        theta1 = np.broadcast_to(theta1[:, :, None], theta5.shape)
+        s1, c1, s5 = np.sin(theta1), np.cos(theta1), np.sin(theta5)
+        R = T[:, None, None, :3, :3]
+        y = (-R[..., 0, 1] * s1 + R[..., 1, 1] * c1)
+        x = (R[..., 0, 0] * s1 - R[..., 1, 0] * c1)
+        singular = np.abs(s5) < 1e-9
+        with np.errstate(invalid="ignore", divide="ignore"):
+            theta6 = np.where(singular, 0.0, np.arctan2(y / np.where(singular, 1, s5),
+                                                        x / np.where(singular, 1, s5)))
+
+        # Joints 2, 3 and 4 are planar: transform the flange back to frame 1 and strip joints 5 and 6
+        q156 = np.zeros(theta5.shape + (6,))
+        q156[..., 0] = theta1
+        q156[..., 4] = theta5
+        q156[..., 5] = theta6
+        A = self._joint_transforms(q156)
+        T14 = (self._rigid_inverse(A[..., 0, :, :]) @ T[:, None, None]
+               @ self._rigid_inverse(A[..., 4, :, :] @ A[..., 5, :, :]))
+
+        # Origin of frame 3 in frame 1, joint 4 only adds d4 along the z-axis
+        px = T14[..., 0, 3]
+        py = T14[..., 1, 3]
+        cos3 = (px ** 2 + py ** 2 - a2 ** 2 - a3 ** 2) / (2 * a2 * a3)
+        with np.errstate(invalid="ignore"):
+            theta3 = np.arccos(np.where(np.abs(cos3) > 1 + 1e-9, np.nan, np.clip(cos3, -1, 1)))
+        theta3 = np.stack([theta3, -theta3], axis=3)                            # (N, 2, 2, 2)
+        px, py = px[..., None], py[..., None]
+        theta2 = np.arctan2(py, px) - np.arctan2(a3 * np.sin(theta3), a2 + a3 * np.cos(theta3))
+        theta234 = np.arctan2(T14[..., 1, 0], T14[..., 0, 0])[..., None]
+        theta4 = theta234 - theta2 - theta3
+
+        shape = theta3.shape
+        q = np.stack([np.broadcast_to(theta1[..., None], shape), theta2, theta3, theta4,
+                      np.broadcast_to(theta5[..., None], shape),
+                      np.broadcast_to(theta6[..., None], shape)], axis=-1).reshape(len(T), 8, 6)
+        return (q + np.pi) % (2 * np.pi) - np.pi
+
+    @staticmethod
+    def _rigid_inverse(T):
+        """
+        Inverse of rigid transformations, cheaper than a general matrix inverse
+        :param T: transformations (..., 4, 4)
+        :return: inverse transformations (..., 4, 4)
+        """
+        inverse = np.zeros_like(T)
+        rotation = np.swapaxes(T[..., :3, :3], -1, -2)
+        inverse[..., :3, :3] = rotation
+        inverse[..., :3, 3] = -(rotation @ T[..., :3, 3, None])[..., 0]
+        inverse[..., 3, 3] = 1
+        return inverse
+
+    @staticmethod
+    def pose_to_matrix(pose):
+        """
+        Convert poses to transformation matrices (Rodrigues' formula)
+        :param pose: poses (N, 6) or (6,), position [m] and axis-angle [rad]
+        :return: transformations (N, 4, 4) or (4, 4)
+        """
+        pose = np.asarray(pose, dtype=float)
+        flat = pose.reshape(-1, 6)
+        rotation = flat[:, 3:]
+        angle = np.linalg.norm(rotation, axis=1)
+        small = angle < 1e-12
+        axis = rotation / np.where(small, 1, angle)[:, None]
+        kx, ky, kz = axis[:, 0], axis[:, 1], axis[:, 2]
+        zero = np.zeros_like(kx)
+        K = np.stack([np.stack([zero, -kz, ky], axis=1),
+                      np.stack([kz, zero, -kx], axis=1),
+                      np.stack([-ky, kx, zero], axis=1)], axis=1)
+        s, c = np.sin(angle)[:, None, None], np.cos(angle)[:, None, None]
+
+        T = np.zeros((len(flat), 4, 4))
+        T[:, :3, :3] = np.eye(3) + s * K + (1 - c) * (K @ K)
+        T[:, :3, 3] = flat[:, :3]
+        T[:, 3, 3] = 1
+        return T.reshape(pose.shape[:-1] + (4, 4))
+
+    @staticmethod
+    def matrix_to_pose(T):
+        """
+        Convert transformation matrices to poses
+        :param T: transformations (N, 4, 4) or (4, 4)
+        :return: poses (N, 6) or (6,), position [m] and axis-angle [rad]
+        """
+        T = np.asarray(T, dtype=float)
+        flat = T.reshape(-1, 4, 4)
+        R = flat[:, :3, :3]
+        skew = np.stack([R[:, 2, 1] - R[:, 1, 2], R[:, 0, 2] - R[:, 2, 0], R[:, 1, 0] - R[:, 0, 1]], axis=1)
+        sin = np.linalg.norm(skew, axis=1) / 2
+        # atan2 keeps the angle accurate close to pi, where arccos of the trace is not
+        angle = np.arctan2(sin, (np.trace(R, axis1=1, axis2=2) - 1) / 2)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            axis = skew / (2 * sin)[:, None]
+
+        # Close to pi the axis follows from the symmetric part, R + R^T = 4kk^T - 2I
+        near_pi = (sin < 1e-6) & (angle > np.pi / 2)
+        if near_pi.any():
+            diagonal = np.sqrt(np.clip((np.diagonal(R[near_pi], axis1=1, axis2=2) + 1) / 2, 0, None))
+            largest = np.argmax(diagonal, axis=1)
+            rows = np.arange(len(largest))
+            column = R[near_pi][rows, :, largest] + R[near_pi][rows, largest, :]
+            column /= 4 * diagonal[rows, largest][:, None]
+            column[rows, largest] = diagonal[rows, largest]
+            # Below pi the axis must point the way of the skew-symmetric part
+            column[np.einsum("ij,ij->i", column, skew[near_pi]) < 0] *= -1
+            axis[near_pi] = column
+        rotation = axis * angle[:, None]
+        rotation[angle < 1e-12] = 0
+
+        return np.concatenate([flat[:, :3, 3], rotation], axis=1).reshape(T.shape[:-2] + (6,))
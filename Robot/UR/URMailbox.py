@@ -0,0 +1,131 @@
+import time
+
+from Robot.UR.URScript import URScript
+
+# The mailbox is a block of general purpose registers that is written by the PC and read by a robot program.
+# All values are sent as signed 32-bit fixed point numbers (value * scale), split over two registers.
+#
+# The block is laid out as follows, starting at the address of the mailbox:
+# +--------------------+----------------------------------------------------+
+# | **Register**       | **Description**                                    |
+# +--------------------+----------------------------------------------------+
+# | address            | Acknowledge, last sequence number read by robot    |
+# +--------------------+----------------------------------------------------+
+# | address + 1        | Buffer 0: sequence, payload, sequence              |
+# +--------------------+----------------------------------------------------+
+# | address + 2 + size | Buffer 1: sequence, payload, sequence              |
+# +--------------------+----------------------------------------------------+
+#
+# The PC writes the buffers in turn, each in a single request, and the robot reads the buffer with the
+# newest sequence number. A buffer is only accepted when both copies of the sequence number match,
+# so a buffer that is read while it is being written is skipped until the next poll.
+# Sequence numbers run from 1 to 65535, 0 means nothing has been written yet.
+
+
+class URMailbox:
+    """Send structured data to a resident robot program through the general purpose registers
+
+    Fields are defined as (name, count, scale) tuples, for example:
+    (("target", 6, 10000), ("counter", 1, 1), ("gripper", 1, 1))
+    A pose with a scale of 10000 is sent with a resolution of 0.1 mm and 0.1 mrad.
+
+    The robot program is generated with script() and polls the mailbox with <name>_poll().
+    """
+
+    def __init__(self, modbus_server, fields, address=128, name="mailbox"):
+        """
+        :param modbus_server: URModbusServer to write the registers with
+        :param fields: Tuples of (name, count, scale) describing the payload
+        :param address: First general purpose register of the mailbox
+        :param name: Prefix of the functions and variables in the robot program
+        """
+        self.modbus_server = modbus_server
+        self.fields = tuple((field, int(count), scale) for field, count, scale in fields)
+        self.name = name
+
+        self.payload_size = 2 * sum(count for _, count, _ in self.fields)
+        self.buffer_size = self.payload_size + 2
+        self.ack_address = address
+        self.buffer_addresses = (address + 1, address + 1 + self.buffer_size)
+
+        end = modbus_server.GENERAL_PURPOSE_REGISTERS_ADDRESS + modbus_server.GENERAL_PURPOSE_REGISTERS_COUNT
+        if address < modbus_server.GENERAL_PURPOSE_REGISTERS_ADDRESS or address + 1 + 2 * self.buffer_size > end:
+            raise ValueError("Mailbox of {} registers does not fit at address {}".format(
+                1 + 2 * self.buffer_size, address))
+        if self.buffer_size > modbus_server.modbusTCP.MAX_WRITE_REGISTERS:
+            raise ValueError("Mailbox buffer of {} registers does not fit in a single request".format(
+                self.buffer_size))
+
+        self.values = {field: (0,) * count for field, count, _ in self.fields}
+        self.scales = {field: scale for field, _, scale in self.fields}
+        self.sequence = 0
+        self.__buffer = 1
+
+    def push(self, **values):
+        """
+        Write the values to the robot in a single request
+        Fields that are not given keep the value of the previous push
+        :param values: Field name with a number (count 1) or a sequence of numbers
+        :return: Boolean to check if the registers have been written
+        """
+        checked = {}
+        for field, value in values.items():
+            if field not in self.values:
+                raise KeyError("Mailbox has no field '{}'".format(field))
+            value = tuple(value) if isinstance(value, (tuple, list)) else (value,)
+            if len(value) != len(self.values[field]):
+                raise ValueError("Mailbox field '{}' takes {} values, got {}".format(
+                    field, len(self.values[field]), len(value)))
+            scale = self.scales[field]
+            for number in value:
+                # Also rejects NaN and infinity
+                if not -0x80000000 - 0.5 <= number * scale < 0x7FFFFFFF + 0.5:
+                    raise ValueError("Mailbox field '{}' value {} does not fit in a signed 32-bit number "
+                                     "at scale {}".format(field, number, scale))
+            checked[field] = value
+        self.values.update(checked)
+
+        sequence = self.sequence % 65535 + 1
+        registers = [sequence]
+        for field, _, scale in self.fields:
+            for value in self.values[field]:
+                word = int(round(value * scale)) & 0xFFFFFFFF
+                registers.append(word >> 16)
+                registers.append(word & 0xFFFF)
+        registers.append(sequence)
+
+        buffer = self.__buffer ^ 1
+        if not self.modbus_server.set_registers(self.buffer_addresses[buffer], registers):
+            return False
+        self.sequence = sequence
+        self.__buffer = buffer
+        return True
+
+    def acknowledged(self):
+        """
+        :return: Boolean, True if the robot has read the last push
+        """
+        return self.modbus_server.get_registers(self.ack_address)[0] == self.sequence
+
+    def wait_acknowledged(self, timeout=1.0, interval=0.005):
+        """
+        Wait until the robot has read the last push
+        :param timeout: Maximum time to wait in seconds
+        :param interval: Time between polls in seconds
+        :return: Boolean, False if the timeout expired
+        """
+        deadline = time.monotonic() + timeout
+        while not self.acknowledged():
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(interval)
+        return True
+
+    def script(self):
+        """
+        Generate the URScript functions that read this mailbox in the robot program
+
+        See :class:`URScript` for detailed information
+        :return: string containing the mailbox script
+        """
+        return URScript.mailbox_reader(self.name, self.ack_address, self.buffer_addresses, self.fields)
@@ -1,5 +1,8 @@
 from Communication.ModbusTCP import ModbusTCP
+from Robot.UR.URIOState import URIOState
+from Robot.UR.URMailbox import URMailbox
 
+import struct
 import time
 
 # The robot controller acts as a Modbus TCP server (port 502),
@@ -27,12 +30,25 @@ class URModbusServer:
     All information will be formatted to human readable information.
     """
 
+    # Coil addresses of the digital IO, standard IO (0-7) followed by configurable IO (8-15)
+    DIGITAL_INPUTS_ADDRESS = 0
+    DIGITAL_OUTPUTS_ADDRESS = 16
+    DIGITAL_IO_COUNT = 16
+
+    # General purpose registers, free to use by external devices and robot programs
+    GENERAL_PURPOSE_REGISTERS_ADDRESS = 128
+    GENERAL_PURPOSE_REGISTERS_COUNT = 128
+
     def __init__(self, host):
         """
         :param host: IP address to connect with
         """
         self.modbusTCP = ModbusTCP(host, 502)
 
+        self.io_state = None        # Last snapshot taken by poll_io
+        self.io_callbacks = []      # (index, rising, falling, callback) called by poll_io
+        self.recorder = None        # URRecorder that records the writes, see URRobot.set_recorder()
+
     def get_tcp_position(self):
         """
         Connects with the Modbus server to requests Cartesian data of the TCP
@@ -53,6 +69,155 @@ class URModbusServer:
             rz = self._format(packet[19:21]) / 1000
             return x, y, z, rx, ry, rz
 
+    def get_joint_positions(self):
+        """
+        Connects with the Modbus server to requests the joint positions
+        :return: Joint positions (base, shoulder, elbow, wrist 1, wrist 2, wrist 3) in radials
+        """
+        packet = self.modbusTCP.read_holding_registers(270, quantity=6)
+
+        if packet is None:
+            time.sleep(0.5)
+            print("Modbus Error: retrying")
+            return self.get_joint_positions()
+        else:
+            return tuple(self._format(packet[i:i + 2]) / 1000 for i in range(9, 21, 2))
+
+    def set_cache_ttl(self, seconds):
+        """
+        Share read responses between all callers for a short period
+
+        See :class:`ModbusTCP` for detailed information
+        """
+        self.modbusTCP.set_cache_ttl(seconds)
+
+    def get_io_state(self):
+        """
+        Read all digital inputs and outputs in a single coil request
+        :return: URIOState snapshot of the IO
+        """
+        count = self.DIGITAL_OUTPUTS_ADDRESS + self.DIGITAL_IO_COUNT
+        packet = self.modbusTCP.read_coils(self.DIGITAL_INPUTS_ADDRESS, quantity=count)
+
+        if packet is None:
+            time.sleep(0.5)
+            print("Modbus Error: retrying")
+            return self.get_io_state()
+        else:
+            byte_count = packet[8]
+            return URIOState.from_coils(packet[9:9 + byte_count], count, time.time())
+
+    def on_io_change(self, io, callback, output=False, rising=True, falling=True):
+        """
+        Register a callback for a changing IO, called from poll_io
+        :param io: The IO as INT (0-7 standard, 8-15 configurable)
+        :param callback: Function called with (io, value, state) when the IO changes
+        :param output: True to watch a digital output instead of an input
+        :param rising: Call when the IO turns on
+        :param falling: Call when the IO turns off
+        """
+        self._check_io_range(io, 1)
+        index = (self.DIGITAL_OUTPUTS_ADDRESS if output else self.DIGITAL_INPUTS_ADDRESS) + io
+        self.io_callbacks.append((index, rising, falling, callback))
+
+    def poll_io(self):
+        """
+        Take a new IO snapshot and call the callbacks of the IO that changed since the last poll
+        The first poll only stores the snapshot
+        :return: URIOState snapshot of the IO
+        """
+        state = self.get_io_state()
+        previous, self.io_state = self.io_state, state
+        if previous is None or not self.io_callbacks:
+            return state
+
+        rising, falling = state.diff(previous)
+        for index, on_rising, on_falling, callback in self.io_callbacks:
+            bit = 1 << index
+            if (on_rising and rising & bit) or (on_falling and falling & bit):
+                io = index - (self.DIGITAL_OUTPUTS_ADDRESS if index >= self.DIGITAL_OUTPUTS_ADDRESS else 0)
+                callback(io, bool(rising & bit), state)
+        return state
+
+    def set_io(self, io, value):
+        """
+        Set a single digital output, does not interrupt a running robot program
+        :param io: The output to set as INT (0-7 standard, 8-15 configurable)
+        :param value: Boolean to enable or disable the output
+        :return: Boolean to check if the output has been set
+        """
+        self._check_io_range(io, 1)
+        packet = self.modbusTCP.write_single_coil(self.DIGITAL_OUTPUTS_ADDRESS + io, value)
+        if packet is not None and self.recorder is not None:
+            self.recorder.record_io(io, [value])
+        return packet is not None
+
+    def set_ios(self, io, values):
+        """
+        Set a range of digital outputs in a single request
+        :param io: The first output to set as INT (0-7 standard, 8-15 configurable)
+        :param values: Booleans for the outputs starting at io
+        :return: Boolean to check if the outputs have been set
+        """
+        values = list(values)
+        self._check_io_range(io, len(values))
+        packet = self.modbusTCP.write_multiple_coils(self.DIGITAL_OUTPUTS_ADDRESS + io, values)
+        if packet is not None and self.recorder is not None:
+            self.recorder.record_io(io, values)
+        return packet is not None
+
+    def get_registers(self, register, quantity=1):
+        """
+        Read a block of registers in a single request
+        :param register: The first register to read
+        :param quantity: Number of registers to read
+        :return: Tuple of unsigned 16-bit values
+        """
+        packet = self.modbusTCP.read_holding_registers(register, quantity=quantity)
+
+        if packet is None:
+            time.sleep(0.5)
+            print("Modbus Error: retrying")
+            return self.get_registers(register, quantity)
+        else:
+            return struct.unpack(">{}H".format(quantity), packet[9:9 + 2 * quantity])
+
+    def mailbox(self, fields, address=128, name="mailbox"):
+        """
+        Create a mailbox in the general purpose registers
+
+        See :class:`URMailbox` for detailed information
+        :return: URMailbox
+        """
+        return URMailbox(self, fields, address, name)
+
+    def set_registers(self, register, values):
+        """
+        Write a block of general purpose registers in a single request
+        :param register: The first general purpose register to write (128-255)
+        :param values: 16-bit values to write, negative values are written as two's complement
+        :return: Boolean to check if the registers have been written
+        """
+        values = list(values)
+        end = self.GENERAL_PURPOSE_REGISTERS_ADDRESS + self.GENERAL_PURPOSE_REGISTERS_COUNT
+        if register < self.GENERAL_PURPOSE_REGISTERS_ADDRESS or register + len(values) > end:
+            raise ValueError("Registers {}-{} are outside the general purpose range {}-{}".format(
+                register, register + len(values) - 1, self.GENERAL_PURPOSE_REGISTERS_ADDRESS, end - 1))
+        packet = self.modbusTCP.write_multiple_registers(register, values)
+        if packet is not None and self.recorder is not None:
+            self.recorder.record_registers(register, values)
+        return packet is not None
+
+    def _check_io_range(self, io, quantity):
+        """
+        Raises a ValueError if the IO range is not a digital output
+        :param io: The first IO
+        :param quantity: Number of IO starting at io
+        """
+        if io < 0 or io + quantity > self.DIGITAL_IO_COUNT:
+            raise ValueError("Digital outputs {}-{} are outside the range 0-{}".format(
+                io, io + quantity - 1, self.DIGITAL_IO_COUNT - 1))
+
     @staticmethod
     def _format(d):
         """Formats signed integers to unsigned float
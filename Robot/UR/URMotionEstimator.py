@@ -0,0 +1,104 @@
+import math
+
+# The UR controller moves with a trapezoidal speed profile: accelerate with a to speed v,
+# move with constant speed and decelerate with a to standstill.
+# If the distance is too short to reach v, the profile is triangular and the top speed is lower.
+#
+#   speed
+#     v |     ___________                  |      /\
+#       |    /           \                 |     /  \
+#       |   /             \                |    /    \
+#       +--+---------------+-- time        +---+------+-- time
+#            trapezoidal                        triangular
+#
+# A move with a time t set always takes t seconds, as time setting has priority over a and v.
+
+
+class URMotionEstimator:
+    """Estimates the duration of moves on the client
+
+    movel is estimated in tool space, using the largest of the translation and the rotation.
+    movej is estimated in joint space, using the leading axis (largest joint move).
+    Joint space estimates of a pose need :class:`URKinematics` to find the joint positions.
+
+    Blends are not taken into account, a blended move finishes earlier than estimated.
+    """
+
+    def __init__(self, kinematics=None):
+        """
+        :param kinematics: URKinematics, needed to estimate movej to a pose
+        """
+        self.kinematics = kinematics
+
+    @staticmethod
+    def profile_duration(distance, a, v):
+        """
+        Duration of a trapezoidal (or triangular) speed profile from standstill to standstill
+        :param distance: distance to travel [m] or [rad]
+        :param a: acceleration [m/s^2] or [rad/s^2]
+        :param v: speed [m/s] or [rad/s]
+        :return: duration [s]
+        """
+        if distance <= 0:
+            return 0.0
+        if v * v / a >= distance:
+            # Triangular, v is never reached
+            return 2 * math.sqrt(distance / a)
+        return distance / v + v / a
+
+    def movel(self, start_pose, pose, a=0.1, v=0.1, t=0):
+        """Duration of a move linear in tool-space
+
+        :param start_pose: current pose (robot readable)
+        :param pose: target pose (robot readable)
+        :param a: tool acceleration [m/2^s]
+        :param v: tool speed [m/s]
+        :param t: time [S], if set this is the duration
+        :return: duration [s]
+        """
+        if t > 0:
+            return t
+        translation = math.sqrt(sum((pose[i] - start_pose[i]) ** 2 for i in range(3)))
+        rotation = self.rotation_angle(start_pose[3:6], pose[3:6])
+        return max(self.profile_duration(translation, a, v), self.profile_duration(rotation, a, v))
+
+    def movej(self, start_q, q, a=0.1, v=0.1, t=0, joint_p=True):
+        """Duration of a move linear in joint-space
+
+        :param start_q: current joint positions [rad]
+        :param q: target joint positions, or a pose if joint_p is False
+        :param a: joint acceleration of leading axis [rad/s^2]
+        :param v: joint speed of leading axis [rad/s]
+        :param t: time [S], if set this is the duration
+        :param joint_p: if True, q is specified as joint positions
+        :return: duration [s], None if the pose is unreachable
+        """
+        if t > 0:
+            return t
+        if not joint_p:
+            if self.kinematics is None:
+                raise ValueError("Estimating movej to a pose needs kinematics")
+            q = self.kinematics.inverse(q, q_near=start_q)
+            if any(math.isnan(value) for value in q):
+                return None
+        leading = max(abs(q[i] - start_q[i]) for i in range(6))
+        return self.profile_duration(leading, a, v)
+
+    @staticmethod
+    def rotation_angle(rotation_a, rotation_b):
+        """
+        Angle of the rotation between two orientations
+        :param rotation_a: axis-angle [rad]
+        :param rotation_b: axis-angle [rad]
+        :return: angle [rad] in the range [0, pi]
+        """
+        def quaternion(rotation):
+            angle = math.sqrt(sum(value ** 2 for value in rotation))
+            if angle < 1e-12:
+                return 1.0, 0.0, 0.0, 0.0
+            s = math.sin(angle / 2) / angle
+            return math.cos(angle / 2), rotation[0] * s, rotation[1] * s, rotation[2] * s
+
+        # The real part of conjugate(a) * b is the dot product of the quaternions
+        dot = sum(x * y for x, y in zip(quaternion(rotation_a), quaternion(rotation_b)))
+        return 2 * math.acos(min(abs(dot), 1.0))
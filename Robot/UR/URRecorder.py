@@ -0,0 +1,311 @@
+import os
+import struct
+import time
+from threading import Lock
+
+from Utils.LazyModule import LazyModule
+
+np = LazyModule("numpy")
+
+# A recording consists of two files:
+# - <path>: a 64 byte header followed by fixed size records, one for each sample
+# - <path>.commands: the scripts and Modbus writes that were sent, back to back.
+#   Records of a command point into this file
+#
+# A Modbus write is stored as the first address (unsigned 16-bit)
+# followed by the values (signed 32-bit), little endian.
+#
+# The header holds a magic string and the number of records written (unsigned 64-bit, little endian).
+# Unknown values of a state sample are stored as NaN (pose, joints) or -1 (io).
+
+MAGIC = b"URREC001"
+HEADER_SIZE = 64
+
+STATE = 0
+COMMAND = 1     # Script sent to the secondary interface
+IO = 2          # Digital outputs written through Modbus
+REGISTERS = 3   # General purpose registers written through Modbus
+
+COMMAND_KINDS = (COMMAND, IO, REGISTERS)
+
+RECORD_FIELDS = [
+    ("time", "<f8"),            # Seconds since the epoch
+    ("kind", "u1"),             # STATE, COMMAND, IO or REGISTERS
+    ("pose", "<f8", (6,)),      # TCP position (x, y, z) in mm (Rx, Ry, Rz) in radians
+    ("joints", "<f8", (6,)),    # Joint positions in radians
+    ("io", "<i8"),              # Bits of a URIOState
+    ("command_offset", "<u8"),  # Position of the script in the commands file
+    ("command_length", "<u4"),  # Length of the script in bytes
+]
+
+
+class URRecorder:
+    """Record robot state samples and issued commands to a binary file
+
+    The records are written through a NumPy memmap, so a sample costs the same
+    regardless of the length of the recording and no Python object is kept per sample.
+    The file grows in steps of its current size when it is full.
+
+    A recording is read back with :class:`URRecording`.
+    """
+
+    def __init__(self, path, capacity=65536):
+        """
+        :param path: File to record to, an existing file is overwritten
+        :param capacity: Number of records to reserve up front
+        """
+        self.dtype = np.dtype(RECORD_FIELDS)
+        self.path = path
+        self.count = 0
+        self.capacity = capacity
+        self.lock = Lock()
+
+        with open(path, "wb") as f:
+            f.write(MAGIC.ljust(HEADER_SIZE, b"\0"))
+            f.truncate(HEADER_SIZE + capacity * self.dtype.itemsize)
+        self.commands = open(path + ".commands", "wb")
+        self.command_offset = 0
+
+        self.records = None
+        self._map()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def record_state(self, pose=None, joints=None, io=None, timestamp=None):
+        """
+        Append a state sample, values that are not given are stored as unknown
+        :param pose: TCP position as returned by URRobot.get_tcp_position()
+        :param joints: Joint positions in radians
+        :param io: URIOState or the bits of one
+        :param timestamp: Time of the sample, defaults to now
+        """
+        with self.lock:
+            i = self._next()
+            self.time[i] = time.time() if timestamp is None else timestamp
+            self.kind[i] = STATE
+            self.pose[i] = np.nan if pose is None else pose
+            self.joints[i] = np.nan if joints is None else joints
+            self.io[i] = -1 if io is None else getattr(io, "bits", io)
+
+    def record_command(self, script, timestamp=None):
+        """
+        Append a command
+        :param script: The encoded script as sent to the robot
+        :param timestamp: Time the command was sent, defaults to now
+        """
+        with self.lock:
+            i = self._next()
+            self.time[i] = time.time() if timestamp is None else timestamp
+            self._append_command(i, COMMAND, script)
+
+    def record_io(self, io, values, timestamp=None):
+        """
+        Append a write of digital outputs
+        :param io: The first output written
+        :param values: Booleans written to the outputs starting at io
+        :param timestamp: Time the outputs were written, defaults to now
+        """
+        self._record_write(IO, io, [int(bool(value)) for value in values], timestamp)
+
+    def record_registers(self, register, values, timestamp=None):
+        """
+        Append a write of general purpose registers
+        :param register: The first register written
+        :param values: Values written to the registers starting at register
+        :param timestamp: Time the registers were written, defaults to now
+        """
+        self._record_write(REGISTERS, register, [int(value) for value in values], timestamp)
+
+    def flush(self):
+        """
+        Write the records and the record count to disk
+        """
+        with self.lock:
+            self._flush()
+
+    def close(self):
+        """
+        Flush and close the recording, the file is truncated to the records written
+        """
+        with self.lock:
+            if self.records is None:
+                return
+            self._flush()
+            self.records = self.header = None
+            self.time = self.kind = self.pose = self.joints = self.io = None
+            self.command_offset_column = self.command_length = None
+            self.commands.close()
+            os.truncate(self.path, HEADER_SIZE + self.count * self.dtype.itemsize)
+
+    def _record_write(self, kind, address, values, timestamp):
+        """
+        Append a Modbus write of values starting at address
+        """
+        data = struct.pack("<H{}i".format(len(values)), address, *values)
+        with self.lock:
+            i = self._next()
+            self.time[i] = time.time() if timestamp is None else timestamp
+            self._append_command(i, kind, data)
+
+    def _append_command(self, i, kind, data):
+        """
+        Store a command in record i and its data in the commands file
+        """
+        self.kind[i] = kind
+        self.command_offset_column[i] = self.command_offset
+        self.command_length[i] = len(data)
+        self.commands.write(data)
+        self.command_offset += len(data)
+
+    def _next(self):
+        """
+        Reserve the next record, grows the file when it is full
+        :return: Index of the record
+        """
+        if self.count == self.capacity:
+            self._flush()
+            self.capacity *= 2
+            os.truncate(self.path, HEADER_SIZE + self.capacity * self.dtype.itemsize)
+            self._map()
+        i = self.count
+        self.count += 1
+        return i
+
+    def _map(self):
+        """
+        Map the header and the records of the file
+        """
+        self.header = np.memmap(self.path, dtype="<u8", mode="r+", offset=len(MAGIC), shape=(1,))
+        self.records = np.memmap(self.path, dtype=self.dtype, mode="r+",
+                                 offset=HEADER_SIZE, shape=(self.capacity,))
+        self.time = self.records["time"]
+        self.kind = self.records["kind"]
+        self.pose = self.records["pose"]
+        self.joints = self.records["joints"]
+        self.io = self.records["io"]
+        self.command_offset_column = self.records["command_offset"]
+        self.command_length = self.records["command_length"]
+
+    def _flush(self):
+        self.commands.flush()
+        self.records.flush()
+        self.header[0] = self.count
+        self.header.flush()
+
+
+class URRecording:
+    """Read a recording made by :class:`URRecorder`
+
+    Records are memory mapped, slicing a time range only reads the records in that range.
+    Samples are expected in order of time, which is the case when the recorder sets the timestamps.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: File of the recording
+        """
+        self.dtype = np.dtype(RECORD_FIELDS)
+        self.path = path
+        with open(path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+        if header[:len(MAGIC)] != MAGIC:
+            raise ValueError("{} is not a robot recording".format(path))
+        count = struct.unpack("<Q", header[len(MAGIC):len(MAGIC) + 8])[0]
+
+        if count:
+            self.records = np.memmap(path, dtype=self.dtype, mode="r", offset=HEADER_SIZE, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=self.dtype)
+
+        commands_path = path + ".commands"
+        if os.path.getsize(commands_path):
+            self.commands = np.memmap(commands_path, dtype="u1", mode="r")
+        else:
+            self.commands = np.zeros(0, dtype="u1")
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, item):
+        return self.records[item]
+
+    def between(self, start=None, end=None):
+        """
+        Records in a time range
+        :param start: Start time (inclusive), None for the start of the recording
+        :param end: End time (exclusive), None for the end of the recording
+        :return: Structured array (view) of the records
+        """
+        times = self.records["time"]
+        first = 0 if start is None else np.searchsorted(times, start, side="left")
+        last = len(times) if end is None else np.searchsorted(times, end, side="left")
+        return self.records[first:last]
+
+    def states(self, start=None, end=None):
+        """
+        :return: Structured array of the state samples in a time range
+        """
+        records = self.between(start, end)
+        return records[records["kind"] == STATE]
+
+    def command_records(self, start=None, end=None):
+        """
+        :return: Structured array of the commands (scripts and Modbus writes) in a time range
+        """
+        records = self.between(start, end)
+        return records[np.isin(records["kind"], COMMAND_KINDS)]
+
+    def script(self, record):
+        """
+        :param record: A command record
+        :return: The encoded script as sent to the robot, or the encoded write of an IO or REGISTERS record
+        """
+        offset = int(record["command_offset"])
+        return self.commands[offset:offset + int(record["command_length"])].tobytes()
+
+    def write(self, record):
+        """
+        :param record: An IO or REGISTERS record
+        :return: Tuple of the first address and the list of values written
+        """
+        data = self.script(record)
+        values = struct.unpack("<H{}i".format((len(data) - 2) // 4), data)
+        return values[0], list(values[1:])
+
+    def replay(self, robot, start=None, end=None, speed=1.0):
+        """
+        Send the recorded commands to a robot with their original timing, IO and registers are written again
+
+        Intended for a simulator, for example URSim running locally: URRobot("127.0.0.1")
+        :param robot: URRobot to send the commands to
+        :param start: Start time of the range to replay
+        :param end: End time of the range to replay
+        :param speed: Time factor, 2.0 replays twice as fast
+        :return: Number of commands sent
+        """
+        records = self.command_records(start, end)
+        if not len(records):
+            return 0
+
+        sent = 0
+        recorded_start = records["time"][0]
+        replay_start = time.monotonic()
+        for record in records:
+            delay = (record["time"] - recorded_start) / speed - (time.monotonic() - replay_start)
+            if delay > 0:
+                time.sleep(delay)
+            kind = record["kind"]
+            if kind == COMMAND:
+                success = robot._send_script(self.script(record))
+            elif kind == IO:
+                success = robot.set_ios(*self.write(record))
+            else:
+                success = robot.set_registers(*self.write(record))
+            if not success:
+                break
+            sent += 1
+        return sent
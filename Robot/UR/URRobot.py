@@ -1,5 +1,6 @@
 from Communication.SocketConnection import SocketConnection
 from Robot.UR.URModbusServer import URModbusServer
+from Robot.UR.URMotionEstimator import URMotionEstimator
 from Robot.UR.URScript import URScript
 
 
@@ -25,22 +26,122 @@ class URRobot:
         self.acceleration = 0.1
         self.velocity = 0.1
 
-    def movel(self, pose, a=0.1, v=0.1, joint_p=False):
+        self.recorder = None    # URRecorder that records the state and commands, see set_recorder()
+        self.motion_estimator = URMotionEstimator()     # Estimates move durations, see estimate_movel()
+        self.safety_limits = None   # URSafetyLimits that moves are checked against, see set_safety_limits()
+
+    def movel(self, pose, a=None, v=None, joint_p=False):
         """Move to position (linear in tool-space)
 
+        a and v default to the acceleration and velocity of the robot
+        The move is not sent if it violates the safety limits, see set_safety_limits()
         See :class:`URScript` for detailed information
         """
+        limits = self.check_motion([pose], a, v, joint_p)
+        if limits is None:
+            return False
+        a, v = limits
         script = URScript.movel(pose, a, v, joint_p=joint_p).encode()
         return self._send_script(script)
 
-    def movej(self, q, a=0.1, v=0.1, joint_p=True):
+    def movej(self, q, a=None, v=None, joint_p=True):
         """Move to position (linear in joint-space)
 
+        a and v default to the acceleration and velocity of the robot
+        The move is not sent if it violates the safety limits, see set_safety_limits()
         See :class:`URScript` for detailed information
         """
+        limits = self.check_motion([q], a, v, joint_p)
+        if limits is None:
+            return False
+        a, v = limits
         script = URScript.movej(q, a, v, joint_p=joint_p).encode()
         return self._send_script(script)
 
+    def check_motion(self, waypoints, a=None, v=None, joint_p=False):
+        """Check a batch of waypoints against the safety limits before sending them
+
+        See :class:`URSafetyLimits` for detailed information
+        :param waypoints: poses or joint positions of the moves
+        :param a: acceleration, defaults to the acceleration of the robot
+        :param v: velocity, defaults to the velocity of the robot
+        :param joint_p: if True, waypoints are specified as joint positions
+        :return: a and v clamped to the limits, None if a waypoint violates the limits
+        """
+        a = self.acceleration if a is None else a
+        v = self.velocity if v is None else v
+        if self.safety_limits is None:
+            return a, v
+
+        q_near = None
+        if self.safety_limits.kinematics is not None and not joint_p:
+            q_near = self.get_joint_positions()
+        valid, a, v, violations = self.safety_limits.check(waypoints, a, v, joint_p, q_near)
+        if not valid.all():
+            print("Safety limits: command rejected"
+                  "\n - {}".format(self.safety_limits.describe(violations)))
+            return None
+        return a.tolist(), v.tolist()
+
+    def set_safety_limits(self, safety_limits):
+        """
+        Check all moves and programs against the safety limits before they are sent
+
+        See :class:`URSafetyLimits` for detailed information
+        :param safety_limits: URSafetyLimits, None to disable the check
+        """
+        self.safety_limits = safety_limits
+
+    def estimate_movel(self, pose, a=None, v=None, t=0):
+        """Estimate the duration of a movel from the current position
+
+        a and v are clamped by the safety limits in the same way as movel does
+        See :class:`URMotionEstimator` for detailed information
+        :return: duration [s]
+        """
+        a, v = self._estimate_speed(a, v)
+        position = list(self.get_tcp_position())
+        position[0:3] = [value / 1000 for value in position[0:3]]
+        return self.motion_estimator.movel(position, pose, a, v, t)
+
+    def estimate_movej(self, q, a=None, v=None, t=0, joint_p=True):
+        """Estimate the duration of a movej from the current joint positions
+
+        A pose (joint_p=False) needs kinematics, see set_kinematics()
+        See :class:`URMotionEstimator` for detailed information
+        :return: duration [s], None if the pose is unreachable
+        """
+        a, v = self._estimate_speed(a, v)
+        return self.motion_estimator.movej(self.get_joint_positions(), q, a, v, t, joint_p)
+
+    def _estimate_speed(self, a, v):
+        """
+        Acceleration and velocity a move would run with, clamped by the safety limits like movel and movej
+        """
+        a = self.acceleration if a is None else a
+        v = self.velocity if v is None else v
+        if self.safety_limits is not None:
+            a, v = self.safety_limits.clamp_speed(a, v)
+        return a, v
+
+    def set_kinematics(self, kinematics):
+        """
+        Set the kinematics of the robot model, used to estimate movej to a pose
+
+        See :class:`URKinematics` for detailed information
+        :param kinematics: URKinematics of the robot
+        """
+        self.motion_estimator.kinematics = kinematics
+
+    def run_program(self, program):
+        """Run a program, e.g. a sequence of blended moves
+
+        See :func:`URScript.program` for detailed information
+        :param program: string containing the program script
+        :return: Boolean to check if the program has been send
+        """
+        return self._send_script(program.encode())
+
     def stopj(self, a=1.5):
         """Stop (linear in joint space)
 
@@ -49,6 +150,14 @@ class URRobot:
         script = URScript.stopj(a).encode()
         return self._send_script(script)
 
+    def stopl(self, a=0.5):
+        """Stop (linear in tool space)
+
+        See :class:`URScript` for detailed information
+        """
+        script = URScript.stopl(a).encode()
+        return self._send_script(script)
+
     def set_tcp(self, pose):
         """Set the Tool Center Point
 
@@ -64,20 +173,61 @@ class URRobot:
         :return: 6 Floats - Position data of TCP (x, y, z) in mm (Rx, Ry, Rz) in radials
         """
         position_data = self.URModbusServer.get_tcp_position()
+        if self.recorder is not None:
+            self.recorder.record_state(pose=position_data)
         return position_data
 
+    def get_joint_positions(self):
+        """ Get joint positions
+
+        :return: 6 Floats - Joint positions (base, shoulder, elbow, wrist 1, wrist 2, wrist 3) in radials
+        """
+        joint_positions = self.URModbusServer.get_joint_positions()
+        if self.recorder is not None:
+            self.recorder.record_state(joints=joint_positions)
+        return joint_positions
+
+    def get_io_state(self):
+        """
+        Get the state of all digital IO in a single request
+
+        See :class:`URIOState` for detailed information
+        :return: URIOState snapshot of the IO
+        """
+        io_state = self.URModbusServer.get_io_state()
+        if self.recorder is not None:
+            self.recorder.record_state(io=io_state, timestamp=io_state.timestamp)
+        return io_state
+
     def set_io(self, io, value):
         """
         Set the specified IO
+
+        Written through the Modbus server, a running robot program is not interrupted
         :param io: The IO to set as INT
         :param value: Boolean to enable or disable IO
-        :return: Boolean to check if the command has been send
+        :return: Boolean to check if the IO has been set
         """
-        script = "set_digital_out({}, {})".format(io, value) + "\n"
-        script = script.encode()
-        return self._send_script(script)
+        return self.URModbusServer.set_io(io, value)
+
+    def set_ios(self, io, values):
+        """
+        Set a range of IO in a single round trip
+        :param io: The first IO to set as INT
+        :param values: Booleans to enable or disable the IO starting at io
+        :return: Boolean to check if the IO have been set
+        """
+        return self.URModbusServer.set_ios(io, values)
+
+    def set_registers(self, register, values):
+        """
+        Write general purpose registers in a single round trip
 
-    def translate(self, vector, a=0.1, v=0.1):
+        See :class:`URModbusServer` for detailed information
+        """
+        return self.URModbusServer.set_registers(register, values)
+
+    def translate(self, vector, a=None, v=None):
         """ Move TCP based on its current position
 
         Example:
@@ -94,6 +244,17 @@ class URRobot:
         tcp_pos[2] = tcp_pos[2] / 1000 + vector[2]
         return self.movel(tcp_pos, a, v)
 
+    def set_recorder(self, recorder):
+        """
+        Record the state that is read, the scripts that are sent and the IO and registers that are written,
+        including the pushes of mailboxes created by the Modbus server
+
+        See :class:`URRecorder` for detailed information
+        :param recorder: URRecorder to record to, None to stop recording
+        """
+        self.recorder = recorder
+        self.URModbusServer.recorder = recorder
+
     def _send_script(self, _script):
         """ Send URScript to the UR controller
 
@@ -105,6 +266,8 @@ class URRobot:
         except OSError as error:
             print("OS error: {0}".format(error))
             return False
+        if self.recorder is not None:
+            self.recorder.record_command(_script)
         return True
 
     @ staticmethod
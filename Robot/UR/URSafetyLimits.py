@@ -0,0 +1,115 @@
+from Utils.LazyModule import LazyModule
+
+np = LazyModule("numpy")
+
+
+class URSafetyLimits:
+    """Pre-flight check of motion commands against workspace and safety limits
+
+    A batch of waypoints is checked at once with array operations, before anything is sent to the robot:
+    - workspace: the TCP position must lie inside a box
+    - planes: the TCP position must lie on the allowed side of every plane
+    - a and v: clamped to the maximum acceleration and velocity (or rejected if clamp is False)
+    - joint limits: needs :class:`URKinematics` for poses, unreachable poses are rejected as well
+
+    Set the limits on the robot with URRobot.set_safety_limits(), moves and programs are then checked
+    before they are sent. A rejected command is not sent at all, so it cannot trigger a protective stop.
+    """
+
+    def __init__(self, workspace=None, planes=(), max_acceleration=0.4, max_velocity=0.4, joint_limits=None,
+                 kinematics=None, clamp=True):
+        """
+        :param workspace: box the TCP must stay in (x_min, y_min, z_min, x_max, y_max, z_max) [m]
+        :param planes: tuples (normal, offset), the TCP position p is allowed if dot(normal, p) >= offset [m]
+        :param max_acceleration: maximum acceleration, tool [m/s^2] and joint [rad/s^2]
+        :param max_velocity: maximum velocity, tool [m/s] and joint [rad/s]
+        :param joint_limits: (min, max) of every joint (6, 2) [rad], None for no limits
+        :param kinematics: URKinematics, needed to check poses against joint limits and reachability and
+        joint positions against the workspace
+        :param clamp: if True a and v are clamped to the maximum, otherwise the command is rejected
+        """
+        self.workspace = None if workspace is None else np.asarray(workspace, dtype=float).reshape(2, 3)
+        self.plane_normals = np.array([normal for normal, _ in planes], dtype=float).reshape(-1, 3)
+        self.plane_offsets = np.array([offset for _, offset in planes], dtype=float)
+        self.max_acceleration = max_acceleration
+        self.max_velocity = max_velocity
+        self.joint_limits = None if joint_limits is None else np.asarray(joint_limits, dtype=float).reshape(6, 2)
+        self.kinematics = kinematics
+        self.clamp = clamp
+
+    def check(self, waypoints, a, v, joint_p=False, q_near=None):
+        """
+        Check a batch of waypoints
+        :param waypoints: poses or joint positions (N, 6) or (6,)
+        :param a: acceleration, a single value or one per waypoint
+        :param v: velocity, a single value or one per waypoint
+        :param joint_p: if True, waypoints are specified as joint positions
+        :param q_near: current joint positions, the inverse kinematics solution of every pose is selected
+        closest to that of the previous waypoint, starting at q_near
+        :return: tuple (valid, a, v, violations).
+        valid is a Boolean array (N,), a and v are clamped to the limits and
+        violations is a dict of Boolean arrays (N,) with the waypoints that violate each limit
+        """
+        waypoints = np.asarray(waypoints, dtype=float).reshape(-1, 6)
+        a = np.asarray(a, dtype=float)
+        v = np.asarray(v, dtype=float)
+        violations = {}
+
+        # Acceleration and velocity
+        too_fast = np.broadcast_to((a > self.max_acceleration) | (v > self.max_velocity), (len(waypoints),))
+        if self.clamp:
+            a = np.minimum(a, self.max_acceleration)
+            v = np.minimum(v, self.max_velocity)
+        else:
+            violations["speed"] = too_fast
+
+        # Joint positions and poses of the waypoints, as far as they are needed and can be computed
+        q = poses = None
+        if joint_p:
+            q = waypoints
+            if self.kinematics is not None and (self.workspace is not None or len(self.plane_offsets)):
+                poses = self.kinematics.forward(q)
+        else:
+            poses = waypoints
+            if self.kinematics is not None:
+                q = self.kinematics.inverse_path(poses, q_start=q_near)
+                violations["unreachable"] = np.isnan(q).any(axis=1)
+
+        if poses is not None:
+            position = poses[:, :3]
+            if self.workspace is not None:
+                outside = (position < self.workspace[0]) | (position > self.workspace[1])
+                violations["workspace"] = outside.any(axis=1)
+            if len(self.plane_offsets):
+                violations["planes"] = (position @ self.plane_normals.T < self.plane_offsets).any(axis=1)
+
+        if q is not None and self.joint_limits is not None:
+            with np.errstate(invalid="ignore"):
+                outside = (q < self.joint_limits[:, 0]) | (q > self.joint_limits[:, 1])
+            violations["joint_limits"] = outside.any(axis=1)
+
+        valid = np.ones(len(waypoints), dtype=bool)
+        for violation in violations.values():
+            valid &= ~violation
+        return valid, a, v, violations
+
+    def clamp_speed(self, a, v):
+        """
+        Acceleration and velocity a single move runs with
+        :param a: acceleration
+        :param v: velocity
+        :return: tuple (a, v), clamped to the maximum if clamp is True
+        """
+        if not self.clamp:
+            return a, v
+        return min(a, self.max_acceleration), min(v, self.max_velocity)
+
+    @staticmethod
+    def describe(violations):
+        """
+        Readable summary of the violations of a check
+        :param violations: dict of violations as returned by check()
+        :return: string listing every violated limit and the waypoints that violate it
+        """
+        return "; ".join("{}: waypoints {}".format(name, np.flatnonzero(mask).tolist())
+                         for name, mask in violations.items() if mask.any())
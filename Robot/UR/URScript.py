@@ -126,3 +126,129 @@ class URScript:
         :return: String containing the stopj script
         """
         return "stopl({})".format(a) + "\n"
+
+    @staticmethod
+    def set_digital_out(n, b):
+        """Set digital output signal level
+
+        :param n: The number (id) of the output, integer: [0:7]
+        :param b: The signal level (boolean)
+        :return: String containing the set_digital_out script
+        """
+        return "set_digital_out({}, {})".format(n, b) + "\n"
+
+    @staticmethod
+    def set_io(io, b):
+        """Set digital output signal level, numbered like URRobot.set_io
+
+        The Modbus coil map numbers the standard outputs 0-7 and the configurable outputs 8-15,
+        the script numbers both from 0.
+        :param io: The number of the output, integer: [0:15]
+        :param b: The signal level (boolean)
+        :return: String containing the set_standard_digital_out or set_configurable_digital_out script
+        """
+        if 0 <= io < 8:
+            return "set_standard_digital_out({}, {})".format(io, b) + "\n"
+        if 8 <= io < 16:
+            return "set_configurable_digital_out({}, {})".format(io - 8, b) + "\n"
+        raise ValueError("IO must be 0-15, got {}".format(io))
+
+    @staticmethod
+    def sleep(t):
+        """Sleep for an amount of time
+
+        :param t: time [s]
+        :return: String containing the sleep script
+        """
+        return "sleep({})".format(t) + "\n"
+
+    @staticmethod
+    def program(name, lines):
+        """Program: wrap script lines in a program
+
+        A program sent to the controller replaces the running program and is executed as a whole,
+        so moves with a blend radius are blended into each other.
+        :param name: name of the program
+        :param lines: script lines, each terminated by a newline
+        :return: String containing the program script
+        """
+        body = "".join("  " + line for line in lines)
+        return "def {}():\n{}end\n".format(name, body)
+
+    @staticmethod
+    def mailbox_reader(name, ack_address, buffer_addresses, fields):
+        """Mailbox reader: functions for a robot program to read a :class:`URMailbox`
+
+        Defines a global variable for each field, <name>_seq and a function <name>_poll().
+        <name>_poll() reads the newest buffer, updates the variables and acknowledges the sequence number.
+        It returns True when new values have been read and False otherwise.
+        :param name: prefix of the functions and variables
+        :param ack_address: register the read sequence number is written to
+        :param buffer_addresses: first register of both buffers
+        :param fields: tuples of (name, count, scale) describing the payload
+        :return: string containing the mailbox script
+        """
+        lines = ["global {}_seq = 0".format(name)]
+        for field, count, _ in fields:
+            if count == 1:
+                initial = "0"
+            else:
+                initial = ("p" if count == 6 else "") + "[{}]".format(", ".join(["0"] * count))
+            lines.append("global {} = {}".format(field, initial))
+
+        lines += [
+            "def {}_word(address):".format(name),
+            "  high = read_port_register(address)",
+            "  if high >= 32768:",
+            "    high = high - 65536",
+            "  end",
+            "  return high * 65536 + read_port_register(address + 1)",
+            "end",
+            "def {}_newer(a, b):".format(name),
+            "  return a == b + 1 or (a == 1 and b == 65535)",
+            "end",
+            "def {}_poll():".format(name),
+            "  global {}_seq".format(name),
+        ]
+        lines += ["  global {}".format(field) for field, _, _ in fields]
+        lines += [
+            "  base = {}".format(buffer_addresses[0]),
+            "  seq = read_port_register({})".format(buffer_addresses[0]),
+            "  seq_1 = read_port_register({})".format(buffer_addresses[1]),
+            "  if {}_newer(seq_1, seq):".format(name),
+            "    base = {}".format(buffer_addresses[1]),
+            "    seq = seq_1",
+            "  end",
+            "  if seq == {}_seq:".format(name),
+            "    return False",
+            "  end",
+        ]
+
+        offset = 1
+        assignments = []
+        for field, count, scale in fields:
+            values = []
+            for _ in range(count):
+                value = "{}_word(base + {})".format(name, offset)
+                values.append(value if scale == 1 else "{} / {}".format(value, float(scale)))
+                offset += 2
+            if count == 1:
+                lines.append("  new_{} = {}".format(field, values[0]))
+            else:
+                prefix = "p" if count == 6 else ""
+                lines.append("  new_{} = {}[{}]".format(field, prefix, ", ".join(values)))
+            assignments.append("  {0} = new_{0}".format(field))
+
+        lines += [
+            "  if read_port_register(base + {}) != seq:".format(offset),
+            "    return False",
+            "  end",
+        ]
+        lines += assignments
+        lines += [
+            "  {}_seq = seq".format(name),
+            "  write_port_register({}, seq)".format(ack_address),
+            "  return True",
+            "end",
+        ]
+        return "\n".join(lines) + "\n"
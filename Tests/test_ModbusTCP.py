@@ -0,0 +1,99 @@
+import socket
+import struct
+import unittest
+from threading import Thread
+
+from Communication.ModbusTCP import ModbusTCP
+
+
+class FakeModbusServer:
+    """
+    Answers one request per connection on a local port: reads with data, writes with an echo
+    """
+
+    def __init__(self, data=b""):
+        self.data = data
+        self.requests = []
+        self.socket = socket.create_server(("127.0.0.1", 0))
+        self.port = self.socket.getsockname()[1]
+        Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                connection, _ = self.socket.accept()
+            except OSError:
+                return
+            with connection:
+                request = connection.recv(1024)
+                self.requests.append(request)
+                transaction_id, protocol_id, _, unit_id, function_code = struct.unpack(">HHHBB", request[:8])
+                if function_code in (ModbusTCP.READ_COILS, ModbusTCP.READ_HOLDING_REGISTERS):
+                    pdu = struct.pack(">BB", function_code, len(self.data)) + self.data
+                else:
+                    pdu = request[7:12]
+                connection.sendall(struct.pack(">HHHB", transaction_id, protocol_id, 1 + len(pdu), unit_id) + pdu)
+
+    def close(self):
+        self.socket.close()
+
+
+class TestModbusTCP(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeModbusServer(b"\x00\x2A")
+        self.modbus = ModbusTCP("127.0.0.1", self.server.port)
+
+    def tearDown(self):
+        self.server.close()
+
+    def test_framing(self):
+        response = self.modbus.read_holding_registers(400, quantity=1)
+        self.assertEqual(response[9:], b"\x00\x2A")
+        request = self.server.requests[0]
+        transaction_id, protocol_id, length, unit_id = struct.unpack(">HHHB", request[:7])
+        self.assertEqual(transaction_id, struct.unpack(">H", response[:2])[0])
+        self.assertEqual((protocol_id, length, unit_id), (0, 6, 0))
+        self.assertEqual(request[7:], struct.pack(">BHH", ModbusTCP.READ_HOLDING_REGISTERS, 400, 1))
+
+    def test_write_multiple_coils(self):
+        values = [True, False, True, True, False, False, False, False, True]
+        self.assertIsNotNone(self.modbus.write_multiple_coils(16, values))
+        # Eight coils per byte, the first coil in the least significant bit
+        self.assertEqual(self.server.requests[0][7:],
+                         struct.pack(">BHHB", ModbusTCP.WRITE_MULTIPLE_COILS, 16, 9, 2) + bytes((0b00001101, 1)))
+
+    def test_write_multiple_coils_count(self):
+        with self.assertRaises(ValueError):
+            self.modbus.write_multiple_coils(16, [])
+        with self.assertRaises(ValueError):
+            self.modbus.write_multiple_coils(0, [True] * (ModbusTCP.MAX_WRITE_COILS + 1))
+        self.assertEqual(self.server.requests, [])
+
+    def test_write_multiple_registers(self):
+        self.assertIsNotNone(self.modbus.write_multiple_registers(128, [1, -1, 65535, -32768]))
+        self.assertEqual(self.server.requests[0][7:], struct.pack(
+            ">BHHB4H", ModbusTCP.WRITE_MULTIPLE_REGISTERS, 128, 4, 8, 1, 0xFFFF, 0xFFFF, 0x8000))
+
+    def test_register_range(self):
+        for value in (65536, -32769):
+            with self.assertRaises(ValueError):
+                self.modbus.write_multiple_registers(128, [0, value])
+            with self.assertRaises(ValueError):
+                self.modbus.write_single_register(128, value)
+        self.assertEqual(self.server.requests, [])
+
+    def test_cache_cleared_by_write(self):
+        self.modbus.set_cache_ttl(10)
+        self.assertEqual(self.modbus.read_holding_registers(128)[9:], b"\x00\x2A")
+        self.server.data = b"\x00\x2B"
+        self.assertEqual(self.modbus.read_holding_registers(128)[9:], b"\x00\x2A")
+        self.assertEqual(len(self.server.requests), 1)
+
+        self.modbus.write_single_coil(16, True)
+        self.assertEqual(self.modbus.read_holding_registers(128)[9:], b"\x00\x2B")
+        self.assertEqual(len(self.server.requests), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
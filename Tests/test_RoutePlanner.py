@@ -0,0 +1,69 @@
+import itertools
+import random
+import unittest
+
+from Robot.RoutePlanner import RoutePlanner
+from Robot.UR.URMotionEstimator import URMotionEstimator
+
+
+class TestRoutePlanner(unittest.TestCase):
+
+    def test_order_on_a_line(self):
+        targets = [(3, 0, 0), (1, 0, 0), (2, 0, 0)]
+        self.assertEqual(RoutePlanner.order((0, 0, 0), targets, (4, 0, 0)), [1, 2, 0])
+        self.assertEqual(RoutePlanner.order((4, 0, 0), targets, (0, 0, 0)), [0, 2, 1])
+
+    def test_order_ends_at_end(self):
+        # Nearest neighbour alone goes to (1, 0) first and has to come back past the start
+        targets = [(1, 0, 0), (-1, 0, 0), (-2, 0, 0)]
+        order = RoutePlanner.order((0, 0, 0), targets, (3, 0, 0))
+        self.assertEqual(order[-1], 0)
+        self.assertEqual(RoutePlanner.length((0, 0, 0), [targets[i] for i in order], (3, 0, 0)), 7)
+
+    def test_order_is_short(self):
+        rng = random.Random(0)
+        for _ in range(20):
+            points = [(rng.random(), rng.random(), 0) for _ in range(7)]
+            start, end, targets = points[0], points[-1], points[1:-1]
+            order = RoutePlanner.order(start, targets, end)
+            self.assertEqual(sorted(order), list(range(len(targets))))
+            length = RoutePlanner.length(start, [targets[i] for i in order], end)
+            shortest = min(RoutePlanner.length(start, route, end) for route in itertools.permutations(targets))
+            self.assertLess(length, shortest * 1.1)
+
+    def test_order_empty(self):
+        self.assertEqual(RoutePlanner.order((0, 0, 0), [], (1, 0, 0)), [])
+
+    def test_waypoints(self):
+        targets = [(0.1, 0, 0, 0, 3.14, 0), (0.2, 0.1, 0, 0, 3.14, 0)]
+        drop = (0.5, 0.5, 0.1, 0, 3.14, 0)
+        self.assertEqual(RoutePlanner.waypoints(targets, drop, 0.05), [
+            [0.1, 0, 0.05, 0, 3.14, 0], [0.1, 0, 0, 0, 3.14, 0], [0.1, 0, 0.05, 0, 3.14, 0],
+            [0.2, 0.1, 0.05, 0, 3.14, 0], [0.2, 0.1, 0, 0, 3.14, 0], [0.2, 0.1, 0.05, 0, 3.14, 0],
+            [0.5, 0.5, 0.1, 0, 3.14, 0]])
+
+    def test_program(self):
+        targets = [(0.1, 0, 0, 0, 3.14, 0), (0.2, 0, 0, 0, 3.14, 0)]
+        drop = (0.5, 0.5, 0.1, 0, 3.14, 0)
+        lines = RoutePlanner.program(targets, drop, 8, approach_height=0.04, blend=0.05).splitlines()
+        moves = [line.strip() for line in lines if line.strip().startswith("movel")]
+        # The program moves through the waypoints, the blend is limited to half the approach height
+        self.assertEqual(len(moves), 7)
+        self.assertEqual(moves[0], "movel(p[0.1, 0, 0.04, 0, 3.14, 0], a=0.1, v=0.1, t=0, r=0.02)")
+        self.assertEqual(moves[1], "movel(p[0.1, 0, 0, 0, 3.14, 0], a=0.1, v=0.1, t=0, r=0)")
+        self.assertEqual(moves[-1], "movel(p[0.5, 0.5, 0.1, 0, 3.14, 0], a=0.1, v=0.1, t=0, r=0)")
+        # IO 8 is the first configurable output, as with URRobot.set_io
+        self.assertEqual(lines[1].strip(), "set_configurable_digital_out(0, True)")
+        self.assertEqual(lines[-3].strip(), "set_configurable_digital_out(0, False)")
+
+    def test_duration(self):
+        targets = [(0.1, 0, 0, 0, 3.14, 0)]
+        drop = (0.1, 0, 0.05, 0, 3.14, 0)
+        # Down 0.05 m and back up, the moves from and to the point above the target take no time.
+        # 0.05 m at a = v = 0.1 is a triangular profile of 2 * sqrt(0.05 / 0.1) s
+        duration = RoutePlanner.duration(URMotionEstimator(), drop, targets, drop, 0.05, 0.1, 0.1, 0.5, 0.2)
+        self.assertAlmostEqual(duration, 2 * 2 * 0.5 ** 0.5 + 0.5 + 0.2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+from Robot.UR.URIOState import URIOState
+
+
+class TestURIOState(unittest.TestCase):
+
+    def test_from_coils(self):
+        # Coils are packed LSB first: coil 0, 2, 15 and output 0 (coil 16) are on
+        state = URIOState.from_coils(bytes((0b00000101, 0b10000000, 0b00000001, 0)), 32)
+        self.assertEqual(state.bits, (1 << 0) | (1 << 2) | (1 << 15) | (1 << 16))
+        self.assertTrue(state.input(0))
+        self.assertFalse(state.input(1))
+        self.assertTrue(state.input(15))
+        self.assertTrue(state.output(0))
+        self.assertFalse(state.output(1))
+
+    def test_from_coils_masks_padding(self):
+        # Bits past the requested count are padding
+        state = URIOState.from_coils(bytes((0xFF,)), 3)
+        self.assertEqual(state.bits, 0b111)
+        self.assertEqual(len(state), 3)
+        with self.assertRaises(IndexError):
+            state[3]
+
+    def test_diff(self):
+        previous = URIOState(0b0110)
+        state = URIOState(0b1100)
+        rising, falling = state.diff(previous)
+        self.assertEqual(rising, 0b1000)
+        self.assertEqual(falling, 0b0010)
+        self.assertEqual(state.diff(None), (0b1100, 0))
+        self.assertEqual(state.diff(state), (0, 0))
+
+    def test_changes(self):
+        previous = URIOState(0b0110 | 1 << 20)
+        state = URIOState(0b1100)
+        self.assertEqual(list(state.changes(previous)), [(1, False), (3, True), (20, False)])
+        self.assertEqual(list(state.changes(None)), [(2, True), (3, True)])
+        self.assertEqual(list(state.changes(state)), [])
+
+    def test_equality(self):
+        self.assertEqual(URIOState(5, timestamp=1), URIOState(5, timestamp=2))
+        self.assertNotEqual(URIOState(5), URIOState(5, count=16))
+        self.assertEqual(len({URIOState(5), URIOState(5)}), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+
+import numpy as np
+
+from Robot.UR.URKinematics import URKinematics, DH_PARAMETERS
+
+# Run from the root of the project:
+#
+#     python -m pytest Tests
+
+
+class TestPoseConversion(unittest.TestCase):
+
+    def assert_round_trip(self, rotations):
+        poses = np.concatenate([np.full((len(rotations), 3), 0.1), rotations], axis=1)
+        T = URKinematics.pose_to_matrix(poses)
+        error = np.abs(URKinematics.pose_to_matrix(URKinematics.matrix_to_pose(T)) - T).max()
+        self.assertLess(error, 1e-9)
+
+    def test_round_trip(self):
+        rng = np.random.default_rng(0)
+        axes = rng.normal(size=(1000, 3))
+        axes /= np.linalg.norm(axes, axis=1)[:, None]
+        self.assert_round_trip(axes * rng.uniform(0, np.pi, (1000, 1)))
+
+    def test_round_trip_near_pi(self):
+        axes = np.array([[0.6, 0.8, 0], [1, 1, 1], [-1, 2, 0.5], [0, -0.3, 0.9], [1, 0, 0], [0, 1, 0]], dtype=float)
+        axes /= np.linalg.norm(axes, axis=1)[:, None]
+        for angle in (np.pi, np.pi - 1e-7, np.pi - 1e-4, 3.14):
+            self.assert_round_trip(axes * angle)
+
+    def test_pose_near_pi(self):
+        pose = URKinematics.matrix_to_pose(URKinematics.pose_to_matrix((0, 0, 0, np.pi * 0.6, np.pi * 0.8, 0)))
+        # At pi the axis may point either way
+        self.assertLess(min(np.abs(pose[3:] - (np.pi * 0.6, np.pi * 0.8, 0)).max(),
+                            np.abs(pose[3:] + (np.pi * 0.6, np.pi * 0.8, 0)).max()), 1e-9)
+
+
+class TestKinematics(unittest.TestCase):
+
+    def setUp(self):
+        self.q = np.random.default_rng(1).uniform(-np.pi, np.pi, (500, 6))
+
+    def test_inverse_all(self):
+        for model in DH_PARAMETERS:
+            kinematics = URKinematics(model, tcp=(0.01, -0.02, 0.1, 0.1, 0.2, 0.3))
+            T = kinematics.forward_matrix(self.q)
+            q = kinematics.inverse_all(kinematics.forward(self.q))
+            valid = ~np.isnan(q).any(axis=2)
+            self.assertTrue(valid.any(axis=1).all(), model)
+            # Every branch reaches the pose
+            error = np.abs(kinematics.forward_matrix(q[valid]) - np.repeat(T[:, None], 8, axis=1)[valid]).max()
+            self.assertLess(error, 1e-6, model)
+
+    def test_inverse(self):
+        for model in DH_PARAMETERS:
+            kinematics = URKinematics(model)
+            q = kinematics.inverse(kinematics.forward(self.q), q_near=self.q)
+            self.assertLess(np.abs(q - self.q).max(), 1e-6, model)
+
+    def test_inverse_path(self):
+        # A path through several turns of the base, every waypoint must follow from the previous one
+        path = np.linspace((-3, -1.2, 1.5, -0.5, 1.2, 0.3), (6, -1.0, 1.8, -1.0, 1.6, 4.0), 200)
+        for model in DH_PARAMETERS:
+            kinematics = URKinematics(model)
+            q = kinematics.inverse_path(kinematics.forward(path), q_start=path[0])
+            self.assertLess(np.abs(q - path).max(), 1e-6, model)
+
+    def test_unreachable(self):
+        kinematics = URKinematics("UR5")
+        self.assertFalse(kinematics.reachable((5, 0, 0, 0, 0, 0)).any())
+        self.assertTrue(np.isnan(kinematics.inverse((5, 0, 0, 0, 0, 0))).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+
+from Communication.ModbusTCP import ModbusTCP
+from Robot.UR.URMailbox import URMailbox
+from Robot.UR.URModbusServer import URModbusServer
+
+
+class FakeModbusServer:
+    """
+    Keeps the registers written by the mailbox
+    """
+    GENERAL_PURPOSE_REGISTERS_ADDRESS = URModbusServer.GENERAL_PURPOSE_REGISTERS_ADDRESS
+    GENERAL_PURPOSE_REGISTERS_COUNT = URModbusServer.GENERAL_PURPOSE_REGISTERS_COUNT
+    modbusTCP = ModbusTCP
+
+    def __init__(self):
+        self.writes = []
+
+    def set_registers(self, register, values):
+        self.writes.append((register, list(values)))
+        return True
+
+
+class TestURMailbox(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeModbusServer()
+        self.mailbox = URMailbox(self.server, (("target", 2, 1000), ("flag", 1, 1)), address=128)
+
+    def test_layout(self):
+        self.assertEqual(self.mailbox.ack_address, 128)
+        self.assertEqual(self.mailbox.buffer_size, 8)
+        self.assertEqual(self.mailbox.buffer_addresses, (129, 137))
+
+    def test_push(self):
+        self.assertTrue(self.mailbox.push(target=(0.001, -0.002), flag=1))
+        # Sequence, every value as a signed 32-bit number high word first, sequence
+        self.assertEqual(self.server.writes[-1], (129, [1, 0, 1, 0xFFFF, 0xFFFE, 0, 1, 1]))
+
+        # Fields that are not given keep their value, the buffers are written in turn
+        self.assertTrue(self.mailbox.push(flag=0))
+        self.assertEqual(self.server.writes[-1], (137, [2, 0, 1, 0xFFFF, 0xFFFE, 0, 0, 2]))
+        self.assertTrue(self.mailbox.push(flag=0))
+        self.assertEqual(self.server.writes[-1][0], 129)
+
+    def test_sequence_wraparound(self):
+        self.mailbox.sequence = 65534
+        self.mailbox.push(flag=1)
+        self.assertEqual(self.mailbox.sequence, 65535)
+        # 0 means nothing has been written, so the sequence wraps to 1
+        self.mailbox.push(flag=1)
+        self.assertEqual(self.mailbox.sequence, 1)
+        self.assertEqual(self.server.writes[-1][1][0], 1)
+        self.assertEqual(self.server.writes[-1][1][-1], 1)
+
+    def test_range(self):
+        self.mailbox.push(target=(0.5, 0.5))
+        for values in ({"flag": 2 ** 31}, {"flag": -2 ** 31 - 1}, {"flag": 1, "target": (float("nan"), 0)},
+                       {"flag": 1, "target": (0.1, 2.2e6)}):
+            with self.assertRaises(ValueError):
+                self.mailbox.push(**values)
+        # A rejected push writes nothing and keeps the previous values
+        self.assertEqual(len(self.server.writes), 1)
+        self.assertEqual(self.mailbox.values, {"target": (0.5, 0.5), "flag": (0,)})
+
+        self.assertTrue(self.mailbox.push(flag=2 ** 31 - 1))
+        self.assertEqual(self.server.writes[-1][1][5:7], [0x7FFF, 0xFFFF])
+
+    def test_fields(self):
+        with self.assertRaises(KeyError):
+            self.mailbox.push(speed=1)
+        with self.assertRaises(ValueError):
+            self.mailbox.push(target=(1, 2, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
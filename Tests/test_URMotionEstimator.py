@@ -0,0 +1,44 @@
+import math
+import unittest
+
+from Robot.UR.URMotionEstimator import URMotionEstimator
+
+
+class TestURMotionEstimator(unittest.TestCase):
+
+    def test_profile_duration_trapezoidal(self):
+        # Accelerating to 0.5 m/s and decelerating take 0.5 s each and cover 0.25 m, 0.75 m at full speed
+        self.assertAlmostEqual(URMotionEstimator.profile_duration(1.0, 1.0, 0.5), 0.5 + 1.5 + 0.5)
+
+    def test_profile_duration_triangular(self):
+        # v is never reached, half of the distance is covered accelerating: d / 2 = a * t^2 / 2
+        self.assertAlmostEqual(URMotionEstimator.profile_duration(0.01, 1.0, 1.0), 2 * math.sqrt(0.01))
+
+    def test_profile_duration_boundary(self):
+        # At d = v^2 / a both profiles take 2 * v / a
+        self.assertAlmostEqual(URMotionEstimator.profile_duration(0.25, 1.0, 0.5), 1.0)
+        self.assertAlmostEqual(URMotionEstimator.profile_duration(0.25 - 1e-9, 1.0, 0.5), 1.0, places=6)
+        self.assertAlmostEqual(URMotionEstimator.profile_duration(0.25 + 1e-9, 1.0, 0.5), 1.0, places=6)
+
+    def test_profile_duration_zero(self):
+        self.assertEqual(URMotionEstimator.profile_duration(0, 1.0, 0.5), 0.0)
+
+    def test_movel(self):
+        estimator = URMotionEstimator()
+        start = (0, 0, 0, 0, 3.14, 0)
+        self.assertAlmostEqual(estimator.movel(start, (1, 0, 0, 0, 3.14, 0), 1.0, 0.5), 2.5)
+        # The largest of the translation and the rotation
+        self.assertAlmostEqual(estimator.movel((0,) * 6, (0.01, 0, 0, 0, 0, 1.0), 1.0, 0.5), 2.5)
+        # Time setting has priority over a and v
+        self.assertEqual(estimator.movel(start, (1, 0, 0, 0, 3.14, 0), 1.0, 0.5, t=4), 4)
+
+    def test_movej(self):
+        estimator = URMotionEstimator()
+        # The leading axis moves 1 rad
+        self.assertAlmostEqual(estimator.movej((0,) * 6, (0.2, -1, 0.5, 0, 0, 0), 1.0, 0.5), 2.5)
+        with self.assertRaises(ValueError):
+            estimator.movej((0,) * 6, (0.2, 0, 0.5, 0, 3.14, 0), joint_p=False)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+
+import numpy as np
+
+from Robot.UR.URKinematics import URKinematics
+from Robot.UR.URSafetyLimits import URSafetyLimits
+
+
+class TestURSafetyLimits(unittest.TestCase):
+
+    def test_workspace(self):
+        limits = URSafetyLimits(workspace=(-0.5, -0.5, 0, 0.5, 0.5, 0.5))
+        valid, _, _, violations = limits.check([(0, 0, 0.1, 0, 3.14, 0), (0.6, 0, 0.1, 0, 3.14, 0),
+                                                (0, 0, -0.01, 0, 3.14, 0)], 0.1, 0.1)
+        self.assertEqual(valid.tolist(), [True, False, False])
+        self.assertEqual(violations["workspace"].tolist(), [False, True, True])
+
+    def test_planes(self):
+        # Stay above z = 0.05 and at x <= 0.3
+        limits = URSafetyLimits(planes=(((0, 0, 1), 0.05), ((-1, 0, 0), -0.3)))
+        valid, _, _, _ = limits.check([(0, 0, 0.1, 0, 0, 0), (0, 0, 0.01, 0, 0, 0), (0.4, 0, 0.1, 0, 0, 0)],
+                                      0.1, 0.1)
+        self.assertEqual(valid.tolist(), [True, False, False])
+
+    def test_clamp(self):
+        limits = URSafetyLimits(max_acceleration=0.4, max_velocity=0.2)
+        valid, a, v, _ = limits.check((0, 0, 0.1, 0, 0, 0), 1.0, 0.1)
+        self.assertTrue(valid.all())
+        self.assertEqual((a.tolist(), v.tolist()), (0.4, 0.1))
+        self.assertEqual(limits.clamp_speed(1.0, 1.0), (0.4, 0.2))
+
+    def test_reject_speed(self):
+        limits = URSafetyLimits(max_acceleration=0.4, max_velocity=0.2, clamp=False)
+        valid, a, v, violations = limits.check([(0, 0, 0.1, 0, 0, 0)] * 2, [0.1, 1.0], 0.1)
+        self.assertEqual(violations["speed"].tolist(), [False, True])
+        self.assertEqual(valid.tolist(), [True, False])
+        self.assertEqual(a.tolist(), [0.1, 1.0])
+        self.assertEqual(limits.clamp_speed(1.0, 1.0), (1.0, 1.0))
+
+    def test_joint_limits(self):
+        limits = URSafetyLimits(joint_limits=[(-np.pi, np.pi)] * 6)
+        valid, _, _, violations = limits.check([(0, -1, 1, 0, 1, 0), (0, -1, 1, 0, 1, 4)], 0.1, 0.1, joint_p=True)
+        self.assertEqual(valid.tolist(), [True, False])
+        self.assertEqual(violations["joint_limits"].tolist(), [False, True])
+
+    def test_poses(self):
+        kinematics = URKinematics("UR5")
+        q = np.array([(0.1, -1.2, 1.5, -0.5, 1.2, 0.3), (0.2, -1.1, 1.4, -0.6, 1.3, 3.0)])
+        poses = np.vstack([kinematics.forward(q), (5, 0, 0, 0, 0, 0)])
+        limits = URSafetyLimits(joint_limits=[(-2, 2)] * 5 + [(-np.pi, 2)], kinematics=kinematics)
+        valid, _, _, violations = limits.check(poses, 0.1, 0.1, q_near=q[0])
+        self.assertEqual(violations["unreachable"].tolist(), [False, False, True])
+        # The wrist follows on from the first waypoint to 3.0 instead of wrapping to -3.28
+        self.assertEqual(violations["joint_limits"].tolist(), [False, True, False])
+        self.assertEqual(valid.tolist(), [True, False, False])
+
+
+if __name__ == "__main__":
+    unittest.main()
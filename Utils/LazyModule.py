@@ -0,0 +1,24 @@
+import importlib
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first use
+
+    Heavy dependencies such as NumPy and OpenCV are bound at module level with
+    np = LazyModule("numpy"), importing the module that does so does not load them.
+    The first attribute access imports the module and copies its attributes onto the stand-in,
+    so later accesses cost the same as on the module itself.
+    """
+
+    def __init__(self, name):
+        """
+        :param name: Name of the module to import
+        """
+        self.__name = name
+
+    def __getattr__(self, attribute):
+        # Only called for attributes that have not been copied yet
+        module = importlib.import_module(self.__name)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attribute)
@@ -1,6 +1,9 @@
-from threading import Thread, Lock
-from queue import Queue
-import cv2
+from threading import Thread, Lock, Condition, current_thread
+import time
+
+from Utils.LazyModule import LazyModule
+
+cv2 = LazyModule("cv2")
 
 
 class Camera:
@@ -14,20 +17,29 @@ class Camera:
     Camera can be stopped with camera.stop() and the view with camera.end()
     """
 
-    def __init__(self, src=0, width=1280, height=720):
+    def __init__(self, src=0, width=1280, height=720, port=5000, low_latency=True, decoder_threads=0,
+                 pixel_format="BGR"):
         """
         :param src: defines which camera to use
         :param width: define the width in pixels
         :param height: define the height in pixels
+        :param port: UDP port of the Gstreamer stream
+        :param low_latency: only keep the newest frame of the Gstreamer stream, see _cap_stream()
+        :param decoder_threads: number of H.264 decoder threads, 0 lets the decoder decide
+        :param pixel_format: "BGR" or "GRAY8" when only a grayscale frame is needed
         """
         if src is 0:
             self.stream = cv2.VideoCapture(src)
             self.stream.set(cv2.CAP_PROP_FRAME_WIDTH, width)
             self.stream.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+            if low_latency:
+                self.stream.set(cv2.CAP_PROP_BUFFERSIZE, 1)
         else:
-            self.stream = self._cap_stream()
+            self.stream = self._cap_stream(port, low_latency, decoder_threads, pixel_format)
 
         (self.grabbed, self.frame) = self.stream.read()
+        self.frame_time = time.monotonic()  # Time the current frame was received
+        self.frame_index = 0                # Number of the current frame, increases with every frame
 
         self.frame_width = width
         self.frame_height = height
@@ -38,9 +50,12 @@ class Camera:
         self.polling = False    # Check for the polling thread to see if it's running
         self.viewing = False    # Check for the viewing thread to see if it's running
 
-        self.Q_view = Queue(maxsize=10)     # Polling thread stores frames here for video show thread
+        self.view_fps = 15          # Target frame rate of the view
+        self.view_scale = 1.0       # Scale of the view relative to the captured frame
+        self.view_overlay = None    # Function drawing on the view frame before it is shown
 
         self.read_lock = Lock()
+        self.new_frame = Condition(self.read_lock)  # Notified by the polling thread for every frame
 
     def start(self):
         """
@@ -61,7 +76,7 @@ class Camera:
         self.end()
         if self.polling:
             self.polling = False
-            if self.thread_video_poll.is_alive():
+            if self.thread_video_poll.is_alive() and self.thread_video_poll is not current_thread():
                 self.thread_video_poll.join(1)
 
     def _update(self):
@@ -70,32 +85,102 @@ class Camera:
                 self.stop()
             else:
                 (grabbed, frame) = self.stream.read()
+                frame_time = time.monotonic()
                 with self.read_lock:
                     (self.grabbed, self.frame) = grabbed, frame
-                if not self.Q_view.full():
-                    self.Q_view.put(frame)
+                    self.frame_time = frame_time
+                    self.frame_index += 1
+                    self.new_frame.notify_all()
 
     def read(self):
         """
         Reads single frame from the camera stream
-        :return: frame
+        :return: frame, None if the last grab failed
         """
         with self.read_lock:
-            frame = self.frame.copy()
+            frame = None if self.frame is None else self.frame.copy()
         return frame
 
-    def show(self):
+    def read_stamped(self):
+        """
+        Reads single frame from the camera stream together with the time it was received
+        :return: frame, time (time.monotonic()) and index of the frame, None if the last grab failed
+        """
+        with self.read_lock:
+            if self.frame is None:
+                return None
+            frame = self.frame.copy()
+            frame_time, frame_index = self.frame_time, self.frame_index
+        return frame, frame_time, frame_index
+
+    def read_next(self, index, timeout=1.0):
+        """
+        Waits for a frame newer than index and reads it like read_stamped()
+        :param index: index of the last frame that was read
+        :param timeout: maximum time to wait for the frame in seconds
+        :return: frame, time (time.monotonic()) and index of the frame,
+        None if no frame arrived in time or the grab failed
+        """
+        with self.read_lock:
+            self.new_frame.wait_for(lambda: self.frame_index > index or not self.polling, timeout)
+            if self.frame_index <= index or self.frame is None:
+                return None
+            frame = self.frame.copy()
+            frame_time, frame_index = self.frame_time, self.frame_index
+        return frame, frame_time, frame_index
+
+    def measure_latency(self, trigger, threshold=30, timeout=2.0):
+        """ Measure the glass-to-frame latency of the camera stream
+
+        Calls trigger, which should cause a sudden change in brightness in view of the camera,
+        for example by switching a lamp on the robot IO. The change happens at some moment during
+        the call of trigger, e.g. a Modbus write includes connecting and waiting for the reply.
+        So the latency is returned as bounds: the time from the end and from the start of the trigger
+        to the first received frame in which the mean brightness changed by threshold.
+        :param trigger: function that causes the change in brightness
+        :param threshold: change in mean brightness (0-255) that detects the trigger
+        :param timeout: maximum time to wait for the change in seconds
+        :return: tuple (minimum, maximum) latency in seconds, None if no change was detected
+        """
+        stamped = self.read_stamped()
+        if stamped is None:
+            return None
+        frame, _, index = stamped
+        baseline = cv2.mean(frame)[0]
+
+        start = time.monotonic()
+        trigger()
+        end = time.monotonic()
+        while time.monotonic() - start < timeout:
+            stamped = self.read_next(index, max(timeout - (time.monotonic() - start), 0))
+            if stamped is None:
+                return None
+            frame, frame_time, index = stamped
+            if abs(cv2.mean(frame)[0] - baseline) > threshold:
+                return max(frame_time - end, 0.0), frame_time - start
+        return None
+
+    def show(self, fps=15, scale=1.0, overlay=None):
         """ View camera stream
 
         Starts a thread that calls an internal function which uses the cv2.imshow() function.
         cv2.immshow() is not thread safe and there can be only one cv2.imshow() function.
         The cv2.imshow() function should be used on the main thread.
 
+        The view only takes the newest frame at the target frame rate, frames in between are skipped.
+        It never holds up the capture stream and costs nothing when not viewing.
+
         Be sure to end the view if using cv2.imshow() yourself and start the view when needed again
         by calling Camera.end() and Camera.show() respectively
+        :param fps: target frame rate of the view
+        :param scale: scale of the view relative to the captured frame, e.g. 0.5 for half size
+        :param overlay: function called with the (scaled) frame to draw on before it is shown
         """
         if self.viewing:
             return None
+        self.view_fps = fps
+        self.view_scale = scale
+        self.view_overlay = overlay
         self.thread_video_show = Thread(target=self._view, args=())
         self.viewing = True
         self.thread_video_show.start()
@@ -106,31 +191,80 @@ class Camera:
         """
         if self.viewing:
             self.viewing = False
-            cv2.destroyWindow("Video")
-            if self.thread_video_show.is_alive():
+            with self.read_lock:
+                self.new_frame.notify_all()
+            if self.thread_video_show.is_alive() and self.thread_video_show is not current_thread():
                 self.thread_video_show.join(1)
 
     def _view(self):
+        interval = 1.0 / self.view_fps
+        shown_index = -1
+        next_show = time.monotonic()
         while self.viewing:
-            frame = self.Q_view.get()
+            delay = next_show - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            next_show = max(next_show + interval, time.monotonic())
+
+            with self.read_lock:
+                if self.frame_index == shown_index:
+                    self.new_frame.wait(interval)
+                frame, shown_index = self.frame, self.frame_index
+            if not self.viewing:
+                break
+            if frame is None:
+                continue
+
+            if self.view_scale != 1.0:
+                frame = cv2.resize(frame, None, fx=self.view_scale, fy=self.view_scale,
+                                   interpolation=cv2.INTER_AREA)
+            elif self.view_overlay is not None:
+                frame = frame.copy()
+            if self.view_overlay is not None:
+                self.view_overlay(frame)
+
             cv2.imshow("Video", frame)
             if cv2.waitKey(1) == 27:
                 self.end()
                 break
+        cv2.destroyWindow("Video")
 
     @staticmethod
-    def _cap_stream():
+    def _cap_stream(port=5000, low_latency=True, decoder_threads=0, pixel_format="BGR"):
         """
         Connect with a Gstreamer socket that's sending to this terminal
+
+        In low latency mode the appsink only keeps the newest frame (drop=true max-buffers=1)
+        and does not wait for the clock (sync=false), so a read always returns the newest frame.
+        :param port: UDP port of the stream
+        :param low_latency: drop frames that have not been read instead of buffering them
+        :param decoder_threads: number of H.264 decoder threads, 0 lets the decoder decide
+        :param pixel_format: "BGR" or "GRAY8" to convert to grayscale in the pipeline
         :return: Captured stream
         """
         # Todo: Check if the stream can be captured or not
         network_video_stream = cv2.VideoCapture(
-            'udpsrc port=5000 caps=application/x-rtp,'
-            'media=(string)video,'
-            'clock-rate=(int)90000,'
-            'encoding-name=(string)H264,'
-            'payload=(int)96 ! rtpjitterbuffer ! rtph264depay ! avdec_h264 ! videoconvert ! appsink ',
-            cv2.CAP_GSTREAMER)
+            Camera._pipeline(port, low_latency, decoder_threads, pixel_format), cv2.CAP_GSTREAMER)
 
         return network_video_stream
+
+    @staticmethod
+    def _pipeline(port=5000, low_latency=True, decoder_threads=0, pixel_format="BGR"):
+        """
+        Create the Gstreamer pipeline for the UDP/H.264 stream
+        :return: String containing the pipeline
+        """
+        decoder = "avdec_h264"
+        if decoder_threads:
+            decoder += " max-threads={}".format(decoder_threads)
+        sink = "appsink"
+        if low_latency:
+            sink += " drop=true max-buffers=1 sync=false"
+
+        return ('udpsrc port={} caps=application/x-rtp,'
+                'media=(string)video,'
+                'clock-rate=(int)90000,'
+                'encoding-name=(string)H264,'
+                'payload=(int)96 ! rtpjitterbuffer{} ! rtph264depay ! {} ! '
+                'videoconvert ! video/x-raw,format={} ! {}').format(
+            port, " latency=0" if low_latency else "", decoder, pixel_format, sink)